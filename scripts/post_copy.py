@@ -27,16 +27,132 @@ for more details.
 """
 
 
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional
 import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import hashlib
+import json
 import os
 import shutil
 import subprocess
 import sys
+import threading
+import time
+
+if sys.platform != "win32":
+    import fcntl
 
 from constants import PYTHON_VERSION_CHOICES, CUDA_VERSION_CHOICES
 
 
+# The environment variable that, if set, gives a wheelhouse directory to download
+# dependencies into and install them from
+WHEELHOUSE_ENVIRONMENT_VARIABLE = "COPIER_ML_WHEELHOUSE"
+
+# What the lockfile management script imports, which has to be installed into a new
+# venv before the script can install anything else
+LOCKFILE_SCRIPT_REQUIREMENTS = [
+    "termcolor>=2.3.0",
+    "tomli>=2.0.1 ; python_version < '3.11'",
+]
+
+# The environment variable that, if set to a non-empty value, skips this script. This
+# is used by tests that only check rendered files.
+SKIP_ENVIRONMENT_VARIABLE = "COPIER_ML_SKIP_POST_COPY"
+
+# The environment variable that, if set, gives the default for --timings-json
+TIMINGS_JSON_ENVIRONMENT_VARIABLE = "COPIER_ML_TIMINGS_JSON"
+
+# The environment variable that, if set, overrides where venv snapshots are cached
+VENV_CACHE_DIR_ENVIRONMENT_VARIABLE = "COPIER_ML_VENV_CACHE_DIR"
+
+# The environment variable that, if set, overrides the size cap of the venv snapshot
+# cache in gigabytes. Setting it to 0 disables the cache.
+VENV_CACHE_MAX_GB_ENVIRONMENT_VARIABLE = "COPIER_ML_VENV_CACHE_MAX_GB"
+
+# The default size cap of the venv snapshot cache in gigabytes
+DEFAULT_VENV_CACHE_MAX_GB = 20.0
+
+# The filename of the metadata stored next to each venv snapshot
+VENV_SNAPSHOT_METADATA_FILENAME = "snapshot.json"
+
+# The filename of the lock file stored next to each venv snapshot, which was locked
+# from the same dependencies
+VENV_SNAPSHOT_LOCKFILE_FILENAME = "pdm.lock"
+
+# The filename of the lock that is held while snapshots are restored or evicted, so a
+# snapshot is never evicted while it is being restored
+VENV_CACHE_LOCK_FILENAME = ".lock"
+
+
+class StepTimings:
+    """Records how long each step of this script takes.
+
+    Steps may run concurrently on different threads.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.steps: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """Times a step. The step counts as failed if it raises or exits."""
+        start = time.perf_counter()
+        status = "failed"
+
+        try:
+            yield
+            status = "succeeded"
+        finally:
+            with self.lock:
+                self.steps.append(
+                    {
+                        "name": name,
+                        "start_seconds": round(start - self.start, 3),
+                        "seconds": round(time.perf_counter() - start, 3),
+                        "status": status,
+                    }
+                )
+
+    def print_summary(self) -> None:
+        """Prints how long each step took."""
+        print()
+        print("info: step timings:")
+
+        for step in sorted(self.steps, key=lambda step: step["start_seconds"]):
+            print(
+                f"  {step['name']:<20} {step['seconds']:>8.1f}s "
+                f"(started at {step['start_seconds']:.1f}s, {step['status']})"
+            )
+
+        print(f"  {'total':<20} {time.perf_counter() - self.start:>8.1f}s")
+
+    def write_json(self, path: str, arguments: argparse.Namespace) -> None:
+        """Appends the timings of this run to a JSON file holding a list of runs."""
+        runs = []
+
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                runs = json.load(file)
+
+        runs.append(
+            {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python_version": arguments.python_version,
+                "cuda_version": arguments.cuda_version,
+                "seconds": round(time.perf_counter() - self.start, 3),
+                "steps": sorted(self.steps, key=lambda step: step["start_seconds"]),
+            }
+        )
+
+        with open(path, "w") as file:
+            json.dump(runs, file, indent=2)
+
+
 def create_argument_parser() -> argparse.ArgumentParser:
     """Define the command line arguments for this script.
 
@@ -60,6 +176,14 @@ def create_argument_parser() -> argparse.ArgumentParser:
         choices=CUDA_VERSION_CHOICES,
     )
 
+    parser.add_argument(
+        "--timings-json",
+        type=str,
+        default=os.environ.get(TIMINGS_JSON_ENVIRONMENT_VARIABLE),
+        help="A JSON file to append the timings of each step to "
+        f"(default: ${TIMINGS_JSON_ENVIRONMENT_VARIABLE})",
+    )
+
     return parser
 
 
@@ -123,7 +247,9 @@ def venv_exists(copy_directory: str) -> bool:
     return os.path.exists(os.path.join(copy_directory, ".venv"))
 
 
-def create_venv(pdm_path: str, copy_directory: str, python_version: str) -> None:
+def create_venv(
+    pdm_path: str, copy_directory: str, python_version: str, with_pip: bool
+) -> None:
     """Creates a venv for the given directory.
 
     Can exit the script if it fails.
@@ -131,7 +257,10 @@ def create_venv(pdm_path: str, copy_directory: str, python_version: str) -> None
     print(f"info: creating venv for python {python_version}...")
 
     result = subprocess.run(
-        [pdm_path, "venv", "create", "-f", python_version], cwd=copy_directory
+        [pdm_path, "venv", "create", "-f"]
+        + (["--with-pip"] if with_pip else [])
+        + [python_version],
+        cwd=copy_directory,
     )
 
     if result.returncode == 0:
@@ -141,7 +270,14 @@ def create_venv(pdm_path: str, copy_directory: str, python_version: str) -> None
         sys.exit(1)
 
 
-def get_pdm_install_arguments(pdm_path: str, cuda_version: str) -> List[str]:
+def get_pdm_lockfile_name(cuda_version: str) -> str:
+    """Gets the name of the PDM lockfile for the given CUDA version."""
+    return f"pdm.{sys.platform}.{cuda_version}.lock"
+
+
+def get_pdm_install_arguments(
+    pdm_path: str, cuda_version: str, install_self: bool = True
+) -> List[str]:
     """Gets the arguments to the PDM install command."""
     return [
         pdm_path,
@@ -149,12 +285,42 @@ def get_pdm_install_arguments(pdm_path: str, cuda_version: str) -> List[str]:
         "-G",
         cuda_version,
         "-L",
-        f"pdm.{sys.platform}.{cuda_version}.lock",
+        get_pdm_lockfile_name(cuda_version),
         "--skip=:pre",
-    ]
+    ] + ([] if install_self else ["--no-self"])
+
 
+def pdm_lock(pdm_path: str, copy_directory: str, cuda_version: str) -> None:
+    """Resolves dependencies with PDM without installing them.
 
-def pdm_install(pdm_path: str, cuda_version: str) -> None:
+    Can exit the script if it fails.
+    """
+    print("info: locking dependencies from pyproject.toml with pdm...")
+
+    result = subprocess.run(
+        [
+            pdm_path,
+            "lock",
+            "-G",
+            cuda_version,
+            "-L",
+            get_pdm_lockfile_name(cuda_version),
+            "--skip=:pre",
+        ],
+        env={"PDM_IGNORE_ACTIVE_VENV": "true"},
+        cwd=copy_directory,
+    )
+
+    if result.returncode == 0:
+        print("info: dependencies successfully locked")
+    else:
+        print(f"error: unable to lock dependencies (exit status: {result.returncode})")
+        sys.exit(1)
+
+
+def pdm_install(
+    pdm_path: str, copy_directory: str, cuda_version: str, install_self: bool = True
+) -> None:
     """Installs dependencies with PDM.
 
     This bootstraps multiple PDM lockfile management. Can exit the script if it fails.
@@ -162,7 +328,7 @@ def pdm_install(pdm_path: str, cuda_version: str) -> None:
     print("info: installing dependencies from pyproject.toml with pdm...")
 
     result = subprocess.run(
-        get_pdm_install_arguments(pdm_path, cuda_version),
+        get_pdm_install_arguments(pdm_path, cuda_version, install_self),
         env={"PDM_IGNORE_ACTIVE_VENV": "true"},
         cwd=copy_directory,
     )
@@ -176,6 +342,62 @@ def pdm_install(pdm_path: str, cuda_version: str) -> None:
         sys.exit(1)
 
 
+def install_lockfile_script_requirements(pdm_path: str, copy_directory: str) -> None:
+    """Installs what the lockfile management script imports into the venv with pip.
+
+    The wheelhouse path runs the script before any dependencies are installed. Can
+    exit the script if it fails.
+    """
+    print("info: installing requirements of the lockfile management script...")
+
+    result = subprocess.run(
+        [pdm_path, "run", "python", "-m", "pip", "install", "--quiet"]
+        + LOCKFILE_SCRIPT_REQUIREMENTS,
+        cwd=copy_directory,
+    )
+
+    if result.returncode == 0:
+        print("info: requirements successfully installed")
+    else:
+        print(
+            f"error: unable to install requirements (exit status: {result.returncode})"
+        )
+        sys.exit(1)
+
+
+def pdm_install_from_wheelhouse(
+    pdm_path: str, copy_directory: str, cuda_version: str, wheelhouse: str
+) -> None:
+    """Locks and installs dependencies through the wheelhouse.
+
+    Only files that are not already in the wheelhouse are downloaded and installed
+    files are hardlinked to a store shared with other projects. This also uses the
+    new lockfile. Can exit the script if it fails.
+    """
+    print(f"info: installing dependencies through the wheelhouse at {wheelhouse}...")
+
+    result = subprocess.run(
+        [
+            pdm_path,
+            "run",
+            "lockfile",
+            "add",
+            "--wheelhouse",
+            "default" if cuda_version == "not_applicable" else cuda_version,
+        ],
+        env={**os.environ, "PDM_LOCKFILE_WHEELHOUSE": wheelhouse},
+        cwd=copy_directory,
+    )
+
+    if result.returncode == 0:
+        print("info: dependencies successfully installed")
+    else:
+        print(
+            f"error: unable to install dependencies (exit status: {result.returncode})"
+        )
+        sys.exit(1)
+
+
 def use_pdm_lock(pdm_path: str, copy_directory: str, cuda_version: str) -> None:
     """Uses the PDM lock file that was just installed.
 
@@ -201,10 +423,439 @@ def use_pdm_lock(pdm_path: str, copy_directory: str, cuda_version: str) -> None:
         sys.exit(1)
 
 
-if __name__ == "__main__":
-    # Get the arguments for this script and validate them.
-    arguments = get_arguments()
+def stamp_pdm_lock(pdm_path: str, copy_directory: str, cuda_version: str) -> None:
+    """Records that the PDM lock file that was just created is up to date.
+
+    Lockfile management only records this for lock files it creates itself, so
+    without it the new lock file would be reported as stale. Can exit the script if
+    it fails.
+    """
+    print(f"info: recording dependencies hash of pdm lock file for {cuda_version}...")
+
+    result = subprocess.run(
+        [
+            pdm_path,
+            "run",
+            "lockfile",
+            "stamp",
+            "default" if cuda_version == "not_applicable" else cuda_version,
+        ],
+        cwd=copy_directory,
+    )
+
+    if result.returncode == 0:
+        print("info: dependencies hash successfully recorded")
+    else:
+        print(
+            "error: unable to record dependencies hash "
+            f"(exit status: {result.returncode})"
+        )
+        sys.exit(1)
+
+
+def get_venv_cache_dir() -> str:
+    """Gets the directory that venv snapshots are cached in."""
+    return os.environ.get(
+        VENV_CACHE_DIR_ENVIRONMENT_VARIABLE,
+        os.path.join(os.path.expanduser("~"), ".cache", "copier-ml", "venvs"),
+    )
+
+
+def get_venv_cache_max_size() -> int:
+    """Gets the size cap of the venv snapshot cache in bytes."""
+    max_gb = float(
+        os.environ.get(
+            VENV_CACHE_MAX_GB_ENVIRONMENT_VARIABLE, DEFAULT_VENV_CACHE_MAX_GB
+        )
+    )
+
+    return int(max_gb * 1024**3)
+
 
+def get_venv_snapshot_key(
+    python_version: str, cuda_version: str, copy_directory: str
+) -> Optional[str]:
+    """Gets the key of the venv snapshot for the given versions and dependencies.
+
+    The dependencies are the parts of pyproject.toml that the lock file is resolved
+    from, so the key is known without locking and other project metadata, such as
+    the project name, does not change it. Returns None if pyproject.toml cannot be
+    parsed because tomli is not installed, which copier does not depend on.
+    """
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            return None
+
+    with open(os.path.join(copy_directory, "pyproject.toml"), "rb") as file:
+        pyproject = tomllib.load(file)
+
+    project = pyproject.get("project", {})
+    pdm = pyproject.get("tool", {}).get("pdm", {})
+
+    text = json.dumps(
+        {
+            "python_version": python_version,
+            "cuda_version": cuda_version,
+            "platform": sys.platform,
+            "dependencies": project.get("dependencies", []),
+            "requires-python": project.get("requires-python", ""),
+            "optional-dependencies": project.get("optional-dependencies", {}),
+            "dev-dependencies": pdm.get("dev-dependencies", {}),
+            "source": pdm.get("source", []),
+            "resolution": pdm.get("resolution", {}),
+        },
+        sort_keys=True,
+    )
+
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def get_directory_size(path: str) -> int:
+    """Gets the size of a directory in bytes, counting hardlinked files once."""
+    inodes = set()
+    size = 0
+
+    for directory, _, filenames in os.walk(path):
+        for filename in filenames:
+            stat = os.lstat(os.path.join(directory, filename))
+
+            if (stat.st_dev, stat.st_ino) not in inodes:
+                inodes.add((stat.st_dev, stat.st_ino))
+                size += stat.st_size
+
+    return size
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    """Hardlinks a file, or copies it if it is on a different filesystem."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def relocate_venv(venv_directory: str, old_project: str, new_project: str) -> None:
+    """Replaces the old project path in the venv's scripts and configuration.
+
+    Files are rewritten rather than modified in place, so files that are hardlinked
+    to the snapshot are left untouched.
+    """
+    paths = [os.path.join(venv_directory, "pyvenv.cfg")]
+
+    for directory in ("bin", "Scripts"):
+        if os.path.isdir(os.path.join(venv_directory, directory)):
+            paths += [
+                os.path.join(venv_directory, directory, filename)
+                for filename in os.listdir(os.path.join(venv_directory, directory))
+            ]
+
+    old_bytes = old_project.encode("utf-8")
+    new_bytes = new_project.encode("utf-8")
+
+    for path in paths:
+        if os.path.islink(path) or not os.path.isfile(path):
+            continue
+
+        with open(path, "rb") as file:
+            content = file.read()
+
+        if b"\0" in content or old_bytes not in content:
+            continue
+
+        temporary_path = f"{path}.relocate"
+
+        with open(temporary_path, "wb") as file:
+            file.write(content.replace(old_bytes, new_bytes))
+
+        shutil.copymode(path, temporary_path)
+        os.replace(temporary_path, path)
+
+
+@contextlib.contextmanager
+def venv_cache_lock(exclusive: bool) -> Iterator[None]:
+    """Holds the venv cache lock, which is shared while restoring snapshots.
+
+    Evicting takes it exclusively, so it waits for every restore to finish. Locking
+    is skipped on Windows, which has no fcntl.
+    """
+    if sys.platform == "win32":
+        yield
+        return
+
+    with open(
+        os.path.join(get_venv_cache_dir(), VENV_CACHE_LOCK_FILENAME), "a"
+    ) as file:
+        fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def restore_venv_snapshot(key: str, copy_directory: str, cuda_version: str) -> bool:
+    """Replaces the project's venv and lock file with a cached snapshot, if any.
+
+    # Returns
+
+    ``True`` if the snapshot was restored, ``False`` if there was none.
+    """
+    snapshot_directory = os.path.join(get_venv_cache_dir(), key)
+    metadata_path = os.path.join(snapshot_directory, VENV_SNAPSHOT_METADATA_FILENAME)
+
+    with venv_cache_lock(exclusive=False):
+        if not os.path.exists(metadata_path):
+            print(f"info: no cached venv snapshot {key}")
+            return False
+
+        print(f"info: restoring cached venv snapshot {key}...")
+
+        with open(metadata_path, "r") as file:
+            metadata = json.load(file)
+
+        venv_directory = os.path.join(copy_directory, ".venv")
+        shutil.rmtree(venv_directory)
+        shutil.copytree(
+            os.path.join(snapshot_directory, "venv"),
+            venv_directory,
+            symlinks=True,
+            copy_function=link_or_copy,
+        )
+        shutil.copyfile(
+            os.path.join(snapshot_directory, VENV_SNAPSHOT_LOCKFILE_FILENAME),
+            os.path.join(copy_directory, get_pdm_lockfile_name(cuda_version)),
+        )
+
+        # Mark the snapshot as recently used for eviction.
+        os.utime(metadata_path)
+
+    relocate_venv(venv_directory, metadata["project"], copy_directory)
+
+    return True
+
+
+def save_venv_snapshot(key: str, copy_directory: str, cuda_version: str) -> None:
+    """Saves the project's venv and lock file as a snapshot in the cache.
+
+    The snapshot is written to a temporary directory and then renamed into place, so
+    concurrent runs never see a partial snapshot.
+    """
+    snapshot_directory = os.path.join(get_venv_cache_dir(), key)
+    temporary_directory = f"{snapshot_directory}.{os.getpid()}.tmp"
+
+    print(f"info: saving venv snapshot {key}...")
+
+    try:
+        shutil.copytree(
+            os.path.join(copy_directory, ".venv"),
+            os.path.join(temporary_directory, "venv"),
+            symlinks=True,
+            copy_function=link_or_copy,
+        )
+        shutil.copyfile(
+            os.path.join(copy_directory, get_pdm_lockfile_name(cuda_version)),
+            os.path.join(temporary_directory, VENV_SNAPSHOT_LOCKFILE_FILENAME),
+        )
+
+        with open(
+            os.path.join(temporary_directory, VENV_SNAPSHOT_METADATA_FILENAME), "w"
+        ) as file:
+            json.dump(
+                {
+                    "project": copy_directory,
+                    "size": get_directory_size(temporary_directory),
+                },
+                file,
+            )
+
+        os.rename(temporary_directory, snapshot_directory)
+    except OSError:
+        # Another run saved the same snapshot first, or the copy failed.
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+
+
+def is_process_running(pid: int) -> bool:
+    """Checks if a process with the given ID is running on this machine."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user.
+        return True
+
+    return True
+
+
+def remove_stale_temporary_snapshots() -> None:
+    """Deletes the temporary directories of snapshot saves that were interrupted.
+
+    Temporary directories are named after the process that writes them, so they are
+    stale once that process is no longer running.
+    """
+    for name in os.listdir(get_venv_cache_dir()):
+        if not name.endswith(".tmp"):
+            continue
+
+        try:
+            pid = int(name.split(".")[-2])
+        except (IndexError, ValueError):
+            continue
+
+        if not is_process_running(pid):
+            print(f"info: removing stale venv snapshot {name}")
+
+            shutil.rmtree(os.path.join(get_venv_cache_dir(), name), ignore_errors=True)
+
+
+def evict_venv_snapshots(max_size: int) -> None:
+    """Deletes the least recently used venv snapshots until the cache fits its cap.
+
+    Stale temporary snapshots are deleted first. This waits for snapshots that are
+    being restored, so they are never deleted from under another run.
+    """
+    with venv_cache_lock(exclusive=True):
+        remove_stale_temporary_snapshots()
+
+        snapshots = []
+
+        for key in os.listdir(get_venv_cache_dir()):
+            metadata_path = os.path.join(
+                get_venv_cache_dir(), key, VENV_SNAPSHOT_METADATA_FILENAME
+            )
+
+            if os.path.exists(metadata_path):
+                with open(metadata_path, "r") as file:
+                    size = json.load(file)["size"]
+
+                snapshots.append((os.path.getmtime(metadata_path), key, size))
+
+        total_size = sum(size for _, _, size in snapshots)
+
+        for _, key, size in sorted(snapshots):
+            if total_size <= max_size:
+                break
+
+            print(f"info: evicting venv snapshot {key}")
+
+            shutil.rmtree(os.path.join(get_venv_cache_dir(), key), ignore_errors=True)
+            total_size -= size
+
+
+def pdm_install_with_venv_cache(
+    pdm_path: str,
+    copy_directory: str,
+    arguments: argparse.Namespace,
+    timings: StepTimings,
+) -> None:
+    """Installs dependencies, reusing a cached venv snapshot if possible.
+
+    Snapshots are keyed by the Python version, the CUDA version and the dependencies
+    in pyproject.toml. They hold the lock file and every dependency except the project
+    itself, which is installed afterwards. Dependencies are only locked if there is no
+    snapshot. Can exit the script if it fails.
+    """
+    key = get_venv_snapshot_key(
+        arguments.python_version, arguments.cuda_version, copy_directory
+    )
+
+    if key is None:
+        print("info: not using the venv cache because tomli is not installed")
+
+        with timings.step("pdm install"):
+            pdm_install(pdm_path, copy_directory, arguments.cuda_version)
+
+        return
+
+    os.makedirs(get_venv_cache_dir(), exist_ok=True)
+
+    with timings.step("venv restore"):
+        restored = restore_venv_snapshot(key, copy_directory, arguments.cuda_version)
+
+    if not restored:
+        with timings.step("pdm lock"):
+            pdm_lock(pdm_path, copy_directory, arguments.cuda_version)
+
+        with timings.step("pdm install (deps)"):
+            pdm_install(
+                pdm_path, copy_directory, arguments.cuda_version, install_self=False
+            )
+
+        with timings.step("venv snapshot"):
+            save_venv_snapshot(key, copy_directory, arguments.cuda_version)
+            evict_venv_snapshots(get_venv_cache_max_size())
+
+    with timings.step("pdm install"):
+        pdm_install(pdm_path, copy_directory, arguments.cuda_version)
+
+
+def set_up_environment(
+    pdm_path: str,
+    copy_directory: str,
+    arguments: argparse.Namespace,
+    timings: StepTimings,
+) -> None:
+    """Creates the venv and installs dependencies into it.
+
+    Can exit the script if it fails.
+    """
+    # Use a wheelhouse if one is configured.
+    wheelhouse = os.environ.get(WHEELHOUSE_ENVIRONMENT_VARIABLE)
+
+    # Only use the venv snapshot cache for venvs that this script creates.
+    use_venv_cache = get_venv_cache_max_size() > 0 and wheelhouse is None
+
+    # Initialize a venv if it doesn't already exist.
+    if venv_exists(copy_directory):
+        print(f"info: {copy_directory} already has a venv")
+        use_venv_cache = False
+    else:
+        with timings.step("venv create"):
+            create_venv(
+                pdm_path,
+                copy_directory,
+                str(arguments.python_version).replace("-", "."),
+                wheelhouse is not None,
+            )
+
+    if wheelhouse is None:
+        # Install dependencies with PDM.
+        if use_venv_cache:
+            pdm_install_with_venv_cache(pdm_path, copy_directory, arguments, timings)
+        else:
+            with timings.step("pdm install"):
+                pdm_install(pdm_path, copy_directory, arguments.cuda_version)
+
+        # Record that the newly created PDM lock is up to date.
+        with timings.step("lockfile stamp"):
+            stamp_pdm_lock(pdm_path, copy_directory, arguments.cuda_version)
+
+        # Use the newly created PDM lock.
+        with timings.step("lockfile use"):
+            use_pdm_lock(pdm_path, copy_directory, arguments.cuda_version)
+    else:
+        # Lock, download and install dependencies through the wheelhouse.
+        with timings.step("lockfile bootstrap"):
+            install_lockfile_script_requirements(pdm_path, copy_directory)
+
+        with timings.step("lockfile add"):
+            pdm_install_from_wheelhouse(
+                pdm_path, copy_directory, arguments.cuda_version, wheelhouse
+            )
+
+
+def main(arguments: argparse.Namespace, timings: StepTimings) -> None:
+    """Sets up the copied project.
+
+    The git repository is initialized at the same time as the venv is created and
+    dependencies are installed. Dependency resolution is not started before the venv
+    exists, since PDM would record whichever interpreter it found first for the
+    project. Can exit the script if it fails.
+    """
     # Detect PDM
     pdm_path = shutil.which("pdm")
 
@@ -223,25 +874,39 @@ if __name__ == "__main__":
         print()
         print("note: it does not appear to be because .copier-answers.yml is missing")
 
-    # Initialize a git repository in the copy directory.
-    initialize_git_repository(copy_directory)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        # Initialize a git repository in the copy directory in the background.
+        def initialize_git_repository_step() -> None:
+            with timings.step("git init"):
+                initialize_git_repository(copy_directory)
 
-    # Initialize a venv if it doesn't already exist.
-    if venv_exists(copy_directory):
-        print(f"info: {copy_directory} already has a venv")
-    else:
-        create_venv(
-            pdm_path, copy_directory, str(arguments.python_version).replace("-", ".")
-        )
+        git_future = executor.submit(initialize_git_repository_step)
 
-    # Install dependencies with PDM.
-    pdm_install(pdm_path, arguments.cuda_version)
+        set_up_environment(pdm_path, copy_directory, arguments, timings)
 
-    # Use the newly created PDM lock.
-    use_pdm_lock(pdm_path, copy_directory, arguments.cuda_version)
+        git_future.result()
 
     # Print a warning about packages that may not be useful.
     print()
     print(
         "warning: Some packages are installed that may not be immediately useful for this project. Please look at pyproject.toml and remove any that you will not use."
     )
+
+
+if __name__ == "__main__":
+    # Get the arguments for this script and validate them.
+    arguments = get_arguments()
+
+    if os.environ.get(SKIP_ENVIRONMENT_VARIABLE):
+        print(f"info: skipping post copy because {SKIP_ENVIRONMENT_VARIABLE} is set")
+        sys.exit(0)
+
+    timings = StepTimings()
+
+    try:
+        main(arguments, timings)
+    finally:
+        timings.print_summary()
+
+        if arguments.timings_json is not None:
+            timings.write_json(arguments.timings_json, arguments)
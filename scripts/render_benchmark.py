@@ -0,0 +1,395 @@
+# Copyright 2023 Sophie Katz
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the “Software”), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+A benchmark for rendering the template.
+
+Renders the template for every combination of Python version and CUDA version in
+constants.py with every optional feature, and for every Python version with none of
+them. For each combination it records how long Jinja takes to compile and render each
+file and how long a whole copier copy takes with the post-copy script disabled.
+Results can be saved as a baseline and later runs compared against it to flag
+regressions.
+"""
+
+
+from typing import Any, Dict, List, Tuple
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import copier
+import plumbum
+from jinja2 import FileSystemLoader
+from jinja2.sandbox import SandboxedEnvironment
+
+from constants import PYTHON_VERSION_CHOICES, CUDA_VERSION_CHOICES
+
+
+# The root of this repository, which is where copier looks for templates to include
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The directory with the files of the template
+TEMPLATE_DIRECTORY = os.path.join(REPOSITORY_DIRECTORY, "template")
+
+# The Jinja extensions that copier loads for this template
+JINJA_EXTENSIONS = [
+    "jinja2_ansible_filters.AnsibleCoreFiltersExtension",
+    "jinja2_time.TimeExtension",
+]
+
+# The optional features that are all turned on or all turned off
+FEATURES = [
+    "use_pytorch",
+    "use_tensorflow",
+    "use_scikit_learn",
+    "use_comet",
+    "use_vscode",
+]
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    """Define the command line arguments for this script."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark rendering the ML copier template"
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="The number of times to render each file, keeping the fastest time",
+    )
+
+    parser.add_argument(
+        "--copy-repeat",
+        type=int,
+        default=3,
+        help="The number of copier copies per combination, keeping the fastest time",
+    )
+
+    parser.add_argument(
+        "--output", type=str, help="A JSON file to write the results to"
+    )
+
+    parser.add_argument(
+        "--baseline", type=str, help="A JSON file of earlier results to compare to"
+    )
+
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="The fraction by which a time may exceed the baseline (default: 0.25)",
+    )
+
+    parser.add_argument(
+        "--min-file-seconds",
+        type=float,
+        default=0.001,
+        help="Regressions in file render times smaller than this are ignored",
+    )
+
+    parser.add_argument(
+        "--min-copy-seconds",
+        type=float,
+        default=0.05,
+        help="Regressions in copy times smaller than this are ignored",
+    )
+
+    return parser
+
+
+def get_combinations() -> List[Tuple[str, str, bool]]:
+    """Gets every combination of Python version, CUDA version and features.
+
+    The CUDA version is only asked for with PyTorch, so combinations without any
+    features render the same tree for every CUDA version and only the first is kept.
+    """
+    return [
+        (python_version, cuda_version, all_features)
+        for python_version in PYTHON_VERSION_CHOICES
+        for cuda_version in CUDA_VERSION_CHOICES
+        for all_features in [False, True]
+        if all_features or cuda_version == CUDA_VERSION_CHOICES[0]
+    ]
+
+
+def get_combination_name(
+    python_version: str, cuda_version: str, all_features: bool
+) -> str:
+    """Gets the name of a combination as used in the results."""
+    return f"{python_version}-{cuda_version}-{'maximal' if all_features else 'minimal'}"
+
+
+def create_data(
+    python_version: str, cuda_version: str, all_features: bool
+) -> Dict[str, Any]:
+    """Creates the answers for a combination."""
+    data: Dict[str, Any] = {
+        "project_name": "Language Model",
+        "project_description": "A toy language model using transformers.",
+        "module_name": "language_model",
+        "package_name": "language-model",
+        "package_version": "0.1.0",
+        "author_name": "Sophie Katz",
+        "author_email": "sophie@example.com",
+        "license": "mit",
+        "copyright_holder": "Sophie Katz",
+        "python_version": python_version,
+        "cuda_version": cuda_version,
+    }
+
+    for feature in FEATURES:
+        data[feature] = all_features
+
+    return data
+
+
+def create_jinja_environment() -> SandboxedEnvironment:
+    """Creates a Jinja environment configured the way copier configures it."""
+    return SandboxedEnvironment(
+        loader=FileSystemLoader([REPOSITORY_DIRECTORY]),
+        extensions=JINJA_EXTENSIONS,
+        keep_trailing_newline=True,
+    )
+
+
+def time_render_files(
+    environment: SandboxedEnvironment, data: Dict[str, Any], repeat: int
+) -> Dict[str, Dict[str, float]]:
+    """Times compiling and rendering each templated file.
+
+    Files whose rendered path is empty are skipped, since copier does not create
+    them.
+
+    # Returns
+
+    A dictionary from rendered path to the fastest compile and render times.
+    """
+    context = dict(
+        data,
+        _copier_answers=data,
+        _copier_conf={"answers_file": ".copier-answers.yml", "sep": os.sep},
+    )
+    results = {}
+
+    for directory, _, filenames in os.walk(TEMPLATE_DIRECTORY):
+        for filename in filenames:
+            if not filename.endswith(".jinja"):
+                continue
+
+            path = os.path.relpath(
+                os.path.join(directory, filename), TEMPLATE_DIRECTORY
+            )
+            rendered_path = environment.from_string(path[: -len(".jinja")]).render(
+                context
+            )
+
+            if any(part == "" for part in rendered_path.split(os.sep)):
+                continue
+
+            with open(os.path.join(directory, filename), "r") as file:
+                text = file.read()
+
+            compile_seconds = float("inf")
+            render_seconds = float("inf")
+
+            for _ in range(repeat):
+                start = time.perf_counter()
+                template = environment.from_string(text)
+                middle = time.perf_counter()
+                template.render(context)
+                end = time.perf_counter()
+
+                compile_seconds = min(compile_seconds, middle - start)
+                render_seconds = min(render_seconds, end - middle)
+
+            results[rendered_path] = {
+                "compile_seconds": compile_seconds,
+                "render_seconds": render_seconds,
+            }
+
+    return results
+
+
+def time_copy(data: Dict[str, Any], repeat: int) -> float:
+    """Times a whole copier copy with the post-copy script disabled.
+
+    # Returns
+
+    The fastest time in seconds.
+    """
+    seconds = float("inf")
+
+    # Copier runs tasks with plumbum's copy of the environment
+    with plumbum.local.env(COPIER_ML_SKIP_POST_COPY="1"):
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as directory:
+                start = time.perf_counter()
+                copier.run_copy(
+                    REPOSITORY_DIRECTORY,
+                    os.path.join(directory, "language-model"),
+                    data=data,
+                    unsafe=True,
+                    quiet=True,
+                )
+                seconds = min(seconds, time.perf_counter() - start)
+
+    return seconds
+
+
+def find_regressions(
+    results: Dict[str, Any], baseline: Dict[str, Any], arguments: argparse.Namespace
+) -> List[str]:
+    """Compares results to a baseline.
+
+    A time regresses if it exceeds the baseline by more than the tolerance and by
+    more than the minimum number of seconds.
+
+    # Returns
+
+    A description of each regression.
+    """
+    regressions = []
+
+    def is_regression(
+        seconds: float, baseline_seconds: float, min_seconds: float
+    ) -> bool:
+        return (
+            seconds > baseline_seconds * (1 + arguments.tolerance)
+            and seconds - baseline_seconds > min_seconds
+        )
+
+    for name, combination in results["combinations"].items():
+        baseline_combination = baseline["combinations"].get(name)
+
+        if baseline_combination is None:
+            continue
+
+        if is_regression(
+            combination["copy_seconds"],
+            baseline_combination["copy_seconds"],
+            arguments.min_copy_seconds,
+        ):
+            regressions.append(
+                f"{name}: copy took {combination['copy_seconds']:.3f}s "
+                f"(baseline: {baseline_combination['copy_seconds']:.3f}s)"
+            )
+
+        for path, file in combination["files"].items():
+            baseline_file = baseline_combination["files"].get(path)
+
+            if baseline_file is None:
+                continue
+
+            seconds = file["compile_seconds"] + file["render_seconds"]
+            baseline_seconds = (
+                baseline_file["compile_seconds"] + baseline_file["render_seconds"]
+            )
+
+            if is_regression(seconds, baseline_seconds, arguments.min_file_seconds):
+                regressions.append(
+                    f"{name}: {path} took {seconds * 1000:.1f}ms "
+                    f"(baseline: {baseline_seconds * 1000:.1f}ms)"
+                )
+
+    return regressions
+
+
+def print_summary(results: Dict[str, Any]) -> None:
+    """Prints the copy time of each combination and the slowest files overall."""
+    print()
+    print("info: copy time per combination:")
+
+    for name, combination in results["combinations"].items():
+        render_seconds = sum(
+            file["compile_seconds"] + file["render_seconds"]
+            for file in combination["files"].values()
+        )
+        print(
+            f"  {name:<30} {combination['copy_seconds']:>7.3f}s "
+            f"(jinja: {render_seconds:.3f}s)"
+        )
+
+    slowest_files: Dict[str, float] = {}
+
+    for combination in results["combinations"].values():
+        for path, file in combination["files"].items():
+            slowest_files[path] = max(
+                slowest_files.get(path, 0.0),
+                file["compile_seconds"] + file["render_seconds"],
+            )
+
+    print()
+    print("info: slowest files to compile and render:")
+
+    for path, seconds in sorted(
+        slowest_files.items(), key=lambda item: item[1], reverse=True
+    )[:10]:
+        print(f"  {seconds * 1000:>8.2f}ms {path}")
+
+
+if __name__ == "__main__":
+    arguments = create_argument_parser().parse_args()
+
+    environment = create_jinja_environment()
+    results: Dict[str, Any] = {"combinations": {}}
+
+    for python_version, cuda_version, all_features in get_combinations():
+        name = get_combination_name(python_version, cuda_version, all_features)
+        data = create_data(python_version, cuda_version, all_features)
+
+        print(f"info: rendering {name}...")
+
+        results["combinations"][name] = {
+            "files": time_render_files(environment, data, arguments.repeat),
+            "copy_seconds": time_copy(data, arguments.copy_repeat),
+        }
+
+    print_summary(results)
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+        print()
+        print(f"info: results written to {arguments.output}")
+
+    if arguments.baseline is not None:
+        with open(arguments.baseline, "r") as file:
+            baseline = json.load(file)
+
+        regressions = find_regressions(results, baseline, arguments)
+
+        print()
+
+        if len(regressions) > 0:
+            print(f"error: {len(regressions)} regressions compared to the baseline:")
+
+            for regression in regressions:
+                print(f"  {regression}")
+
+            sys.exit(1)
+
+        print("info: no regressions compared to the baseline")
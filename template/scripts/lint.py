@@ -0,0 +1,253 @@
+# Copyright 2023 Sophie Katz
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the “Software”), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Command-line utility for running linters concurrently."""
+
+
+import argparse
+import concurrent.futures
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from termcolor import colored
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+# The directory that mypy keeps its incremental cache in, relative to the project root
+MYPY_CACHE_DIRECTORY = ".mypy_cache"
+
+# The project file that configures the linters, relative to the project root
+PYPROJECT_PATH = "pyproject.toml"
+
+# The file that records the state of every file as of the last clean run
+STATE_PATH = ".lint-state.json"
+
+# The arguments of each linter, not including the files to lint
+LINTERS = {
+    "mypy": ["mypy", "--cache-dir", MYPY_CACHE_DIRECTORY],
+    "pycodestyle": ["pycodestyle", "--ignore", "E501,W503,E261"],
+    "pydocstyle": ["pydocstyle"],
+    "bandit": ["bandit", "-q", "-s", "B101", "-r"],
+    "vulture": ["vulture"],
+    "isort": ["isort", "-c"],
+}
+
+# Linters that need to see the whole module, because they check how files use each
+# other. With --changed, they still run on the whole module if any file changed.
+WHOLE_MODULE_LINTERS = ["mypy", "vulture"]
+
+
+def print_info(*args) -> None:
+    """Function to print an info message to the console."""
+    print(colored("==> info:", "green"), *args)
+
+
+def print_error(*args) -> None:
+    """Function to print an error message to the console."""
+    print(colored("==> error:", "red"), *args)
+
+
+def get_module_name() -> str:
+    """Gets the name of the module to lint from ``pyproject.toml``."""
+    with open(PYPROJECT_PATH, "rb") as file:
+        pyproject = tomllib.load(file)
+
+    return pyproject["tool"]["setuptools"]["py-modules"][0]
+
+
+def get_file_states(module_name: str) -> Dict[str, List[int]]:
+    """Gets the size and modification time of every Python file in the module.
+
+    The state of ``pyproject.toml`` is included too, since it configures the linters.
+    """
+    stat = os.stat(PYPROJECT_PATH)
+    states = {PYPROJECT_PATH: [stat.st_size, stat.st_mtime_ns]}
+
+    for directory, directory_names, filenames in os.walk(module_name):
+        directory_names[:] = [name for name in directory_names if name != "__pycache__"]
+
+        for filename in filenames:
+            if filename.endswith(".py"):
+                path = os.path.join(directory, filename)
+                stat = os.stat(path)
+                states[path] = [stat.st_size, stat.st_mtime_ns]
+
+    return states
+
+
+def load_state() -> Dict[str, List[int]]:
+    """Loads the file states recorded by the last clean run."""
+    try:
+        with open(STATE_PATH, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(states: Dict[str, List[int]]) -> None:
+    """Records the file states of a clean run."""
+    with open(STATE_PATH, "w") as file:
+        json.dump(states, file, indent=2, sort_keys=True)
+
+
+def run_linter(
+    name: str, paths: List[str], extra_args: List[str]
+) -> Tuple[int, str, float]:
+    """
+    Runs a linter.
+
+    # Returns
+
+    A tuple ``(exit_status, output, seconds)``.
+    """
+    start = time.perf_counter()
+
+    result = subprocess.run(
+        LINTERS[name] + extra_args + paths,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+    return result.returncode, result.stdout, time.perf_counter() - start
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    """
+    Creates an argument parser.
+
+    This defines the command-line arguments for this script. Unknown arguments are
+    passed on to the linters.
+    """
+    argument_parser = argparse.ArgumentParser(
+        description="Run linters concurrently. Unknown arguments are passed on to "
+        "every linter that is run."
+    )
+
+    argument_parser.add_argument(
+        "linters",
+        nargs="*",
+        default=[],
+        help=f"the linters to run: {', '.join(LINTERS)} (default: all of them)",
+    )
+
+    argument_parser.add_argument(
+        "--changed",
+        action="store_true",
+        help="only lint files changed since the last clean run (mypy and vulture "
+        "still see the whole module)",
+    )
+
+    return argument_parser
+
+
+def main() -> None:
+    """Main function."""
+    arguments, extra_args = create_argument_parser().parse_known_args()
+
+    # Lint from the project root so that paths and caches do not depend on the CWD
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    module_name = get_module_name()
+    linter_names = arguments.linters or list(LINTERS)
+
+    for name in linter_names:
+        if name not in LINTERS:
+            print_error(f"unknown linter {name}")
+            sys.exit(1)
+
+    states = get_file_states(module_name)
+
+    if arguments.changed:
+        previous_states = load_state()
+        changed_paths = sorted(
+            path for path, state in states.items() if previous_states.get(path) != state
+        )
+
+        # The linters are configured in pyproject.toml, so changing it can change the
+        # results for every file
+        if PYPROJECT_PATH in changed_paths:
+            changed_paths = [module_name]
+
+        print_info(f"{len(changed_paths)} files changed since the last clean run")
+    else:
+        changed_paths = [module_name]
+
+    linter_paths = {
+        name: (
+            [module_name]
+            if name in WHOLE_MODULE_LINTERS and len(changed_paths) > 0
+            else changed_paths
+        )
+        for name in linter_names
+    }
+
+    start = time.perf_counter()
+    failed_linter_names = []
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(linter_names)
+    ) as executor:
+        futures = {
+            name: executor.submit(run_linter, name, linter_paths[name], extra_args)
+            for name in linter_names
+            if len(linter_paths[name]) > 0
+        }
+
+        # Print results in a fixed order so that output is stable between runs
+        for name in linter_names:
+            if name not in futures:
+                print(f"  {name}: {colored('skipped', 'green')} (no changed files)")
+                continue
+
+            exit_status, output, seconds = futures[name].result()
+
+            if exit_status == 0:
+                status = colored("passed", "green")
+            else:
+                status = colored(f"failed (exit status: {exit_status})", "red")
+                failed_linter_names.append(name)
+
+            print(f"  {name}: {status} in {seconds:.1f}s")
+
+            if exit_status != 0 and output.strip() != "":
+                for line in output.rstrip().splitlines():
+                    print(f"    {line}")
+
+    print_info(f"linted in {time.perf_counter() - start:.1f}s")
+
+    if len(failed_linter_names) > 0:
+        print_error(f"{', '.join(failed_linter_names)} failed")
+        sys.exit(1)
+
+    # Only a run of every linter without extra arguments proves that files are clean
+    if set(linter_names) == set(LINTERS) and len(extra_args) == 0:
+        save_state(states)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+# Copyright 2023 Sophie Katz
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the “Software”), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Command-line utility for executing notebooks headlessly."""
+
+
+import argparse
+import concurrent.futures
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import nbformat
+from jupyter_client.kernelspec import NoSuchKernel
+from nbclient import NotebookClient
+from nbclient.exceptions import CellExecutionError, CellTimeoutError, DeadKernelError
+from termcolor import colored
+
+# The directory that is searched for notebooks when none are given
+NOTEBOOKS_DIRECTORY = "notebooks"
+
+# The directory that executed notebooks, timings and the cell cache are written to
+OUTPUT_DIRECTORY = os.path.join("artifacts", "logs", "notebooks")
+
+# The tag of the cell after which parameters are injected
+PARAMETERS_TAG = "parameters"
+
+# The tag of the cell that holds injected parameters
+INJECTED_PARAMETERS_TAG = "injected-parameters"
+
+
+def print_info(*args) -> None:
+    """Function to print an info message to the console."""
+    print(colored("==> info:", "green"), *args)
+
+
+def print_error(*args) -> None:
+    """Function to print an error message to the console."""
+    print(colored("==> error:", "red"), *args)
+
+
+def find_notebooks(paths: List[str]) -> List[str]:
+    """
+    Finds the notebooks to execute.
+
+    Directories are searched recursively. Checkpoint directories are skipped.
+    """
+    results = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, directory_names, filenames in os.walk(path):
+                directory_names[:] = sorted(
+                    name for name in directory_names if name != ".ipynb_checkpoints"
+                )
+
+                for filename in sorted(filenames):
+                    if filename.endswith(".ipynb"):
+                        results.append(os.path.join(directory, filename))
+        else:
+            results.append(path)
+
+    return results
+
+
+def parse_parameters(pairs: List[List[str]]) -> Dict[str, Any]:
+    """
+    Parses ``-p NAME VALUE`` pairs.
+
+    Values are parsed as JSON if possible and are otherwise kept as strings.
+    """
+    parameters = {}
+
+    for name, value in pairs:
+        try:
+            parameters[name] = json.loads(value)
+        except json.JSONDecodeError:
+            parameters[name] = value
+
+    return parameters
+
+
+def inject_parameters(notebook: Any, parameters: Dict[str, Any]) -> None:
+    """
+    Injects parameters into a notebook.
+
+    A new cell that assigns the parameters is inserted after the cell tagged
+    ``parameters``, so it overrides the defaults set there. If there is no such cell,
+    it is inserted at the top of the notebook.
+    """
+    if len(parameters) == 0:
+        return
+
+    source = "\n".join(f"{name} = {value!r}" for name, value in parameters.items())
+    cell = nbformat.v4.new_code_cell(source)
+    cell.metadata["tags"] = [INJECTED_PARAMETERS_TAG]
+
+    index = 0
+
+    for i, existing_cell in enumerate(notebook.cells):
+        if PARAMETERS_TAG in existing_cell.metadata.get("tags", []):
+            index = i + 1
+            break
+
+    notebook.cells.insert(index, cell)
+
+
+def get_cell_keys(notebook: Any) -> List[Optional[str]]:
+    """
+    Gets the cache key of each cell.
+
+    The key of a code cell is a hash of its source and the source of every code cell
+    above it, so editing a cell changes its key and the keys of the cells below it.
+    Cells other than code cells have no key.
+    """
+    kernel_name = notebook.metadata.get("kernelspec", {}).get("name", "")
+    digest = hashlib.sha256(kernel_name.encode("utf-8"))
+    keys: List[Optional[str]] = []
+
+    for cell in notebook.cells:
+        if cell.cell_type == "code":
+            digest.update(cell.source.encode("utf-8"))
+            digest.update(b"\0")
+            keys.append(digest.copy().hexdigest())
+        else:
+            keys.append(None)
+
+    return keys
+
+
+def get_cache_path(key: str) -> str:
+    """Gets the path of the cached outputs for a cell key."""
+    return os.path.join(OUTPUT_DIRECTORY, "cache", key[:2], f"{key}.json")
+
+
+def load_cached_outputs(notebook: Any, keys: List[Optional[str]]) -> bool:
+    """
+    Restores the outputs of every code cell from the cache.
+
+    # Returns
+
+    ``True`` if every code cell was cached, ``False`` otherwise (in which case the
+    notebook is left unchanged).
+    """
+    cached_cells: List[Optional[Dict[str, Any]]] = []
+
+    for key in keys:
+        if key is None:
+            cached_cells.append(None)
+        elif os.path.exists(get_cache_path(key)):
+            with open(get_cache_path(key), "r") as file:
+                cached_cells.append(json.load(file))
+        else:
+            return False
+
+    for cell, cached_cell in zip(notebook.cells, cached_cells):
+        if cached_cell is not None:
+            cell.outputs = [
+                nbformat.from_dict(output) for output in cached_cell["outputs"]
+            ]
+            cell.execution_count = cached_cell["execution_count"]
+
+    return True
+
+
+def save_cached_outputs(notebook: Any, keys: List[Optional[str]]) -> None:
+    """Saves the outputs of every executed code cell to the cache."""
+    for cell, key in zip(notebook.cells, keys):
+        if key is None or cell.execution_count is None:
+            continue
+
+        path = get_cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "w") as file:
+            json.dump(
+                {"outputs": cell.outputs, "execution_count": cell.execution_count}, file
+            )
+
+
+def execute_notebook(
+    path: str,
+    run_directory: str,
+    parameters: Dict[str, Any],
+    kernel_name: Optional[str],
+    timeout: int,
+    use_cache: bool,
+) -> Dict[str, Any]:
+    """
+    Executes a notebook and writes the executed copy into the run directory.
+
+    If every code cell is in the cache, the outputs are restored without starting a
+    kernel. Otherwise the whole notebook is executed and the cache is refreshed. Cells
+    above the first changed cell are rerun too, since later cells depend on the kernel
+    state built up by earlier ones and kernel state is not cached.
+
+    Errors from executing the notebook, such as a cell failing or timing out or the
+    kernel dying, are recorded in the summary as a failure rather than raised.
+
+    # Returns
+
+    A summary with the status and timings of the notebook.
+    """
+    notebook = nbformat.read(path, as_version=4)
+    inject_parameters(notebook, parameters)
+    keys = get_cell_keys(notebook)
+
+    summary: Dict[str, Any] = {"path": path, "status": "succeeded", "error": None}
+    cell_seconds: Dict[int, float] = {}
+    cell_starts: Dict[int, float] = {}
+    start = time.perf_counter()
+
+    if use_cache and load_cached_outputs(notebook, keys):
+        summary["status"] = "cached"
+    else:
+
+        def on_cell_start(cell: Any, cell_index: int, **kwargs: Any) -> None:
+            cell_starts[cell_index] = time.perf_counter()
+
+        def on_cell_complete(cell: Any, cell_index: int, **kwargs: Any) -> None:
+            cell_seconds[cell_index] = time.perf_counter() - cell_starts[cell_index]
+
+        client_arguments: Dict[str, Any] = {
+            "timeout": timeout,
+            "resources": {"metadata": {"path": os.path.dirname(path) or "."}},
+            "on_cell_start": on_cell_start,
+            "on_cell_complete": on_cell_complete,
+        }
+
+        if kernel_name is not None:
+            client_arguments["kernel_name"] = kernel_name
+
+        try:
+            NotebookClient(notebook, **client_arguments).execute()
+            save_cached_outputs(notebook, keys)
+        except CellExecutionError as error:
+            summary["status"] = "failed"
+            summary["error"] = f"{error.ename}: {error.evalue}"
+        except (CellTimeoutError, DeadKernelError, NoSuchKernel) as error:
+            summary["status"] = "failed"
+            summary["error"] = f"{type(error).__name__}: {error}"
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["cells"] = [
+        {"index": index, "seconds": seconds}
+        for index, seconds in sorted(cell_seconds.items())
+    ]
+
+    output_path = os.path.join(run_directory, os.path.relpath(path))
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    nbformat.write(notebook, output_path)
+    summary["output_path"] = output_path
+
+    return summary
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    """
+    Creates an argument parser.
+
+    This defines the command-line arguments for this script.
+    """
+    argument_parser = argparse.ArgumentParser(
+        description="Execute notebooks headlessly and in parallel"
+    )
+
+    argument_parser.add_argument(
+        "paths",
+        nargs="*",
+        default=[NOTEBOOKS_DIRECTORY],
+        help=f"notebooks or directories of notebooks (default: {NOTEBOOKS_DIRECTORY})",
+    )
+
+    argument_parser.add_argument(
+        "-p",
+        "--parameter",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("NAME", "VALUE"),
+        help="inject a parameter (values are parsed as JSON if possible)",
+    )
+
+    argument_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="the number of notebooks to execute at once (default: one per CPU)",
+    )
+
+    argument_parser.add_argument(
+        "--kernel", type=str, default=None, help="override the kernel to use"
+    )
+
+    argument_parser.add_argument(
+        "--timeout", type=int, default=600, help="the timeout per cell in seconds"
+    )
+
+    argument_parser.add_argument(
+        "--no-cache", action="store_true", help="execute every notebook in full"
+    )
+
+    return argument_parser
+
+
+def main() -> None:
+    """Main function."""
+    arguments = create_argument_parser().parse_args()
+
+    notebook_paths = find_notebooks(arguments.paths)
+
+    if len(notebook_paths) == 0:
+        print_error("no notebooks found")
+        sys.exit(1)
+
+    parameters = parse_parameters(arguments.parameter)
+    jobs = arguments.jobs or min(len(notebook_paths), os.cpu_count() or 1)
+
+    run_directory = os.path.join(
+        OUTPUT_DIRECTORY, datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    )
+    os.makedirs(run_directory, exist_ok=True)
+
+    print_info(f"executing {len(notebook_paths)} notebooks with {jobs} kernels...")
+
+    start = time.perf_counter()
+    summaries = []
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                execute_notebook,
+                path,
+                run_directory,
+                parameters,
+                arguments.kernel,
+                arguments.timeout,
+                not arguments.no_cache,
+            ): path
+            for path in notebook_paths
+        }
+
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as error:
+                # The worker process died or could not send back its summary
+                summary = {
+                    "path": futures[future],
+                    "status": "failed",
+                    "error": f"{type(error).__name__}: {error}",
+                    "seconds": time.perf_counter() - start,
+                    "cells": [],
+                }
+
+            summaries.append(summary)
+
+            status_color = "red" if summary["status"] == "failed" else "green"
+            print(
+                f"  {colored(summary['status'], status_color)} {summary['path']} "
+                f"({summary['seconds']:.1f}s)"
+            )
+
+            if summary["error"] is not None:
+                print(f"    {summary['error']}")
+
+    timings_path = os.path.join(run_directory, "timings.json")
+
+    with open(timings_path, "w") as file:
+        json.dump(
+            {
+                "parameters": parameters,
+                "seconds": time.perf_counter() - start,
+                "notebooks": sorted(summaries, key=lambda summary: summary["path"]),
+            },
+            file,
+            indent=2,
+        )
+
+    print_info(f"executed notebooks and timings written to {run_directory}")
+
+    if any(summary["status"] == "failed" for summary in summaries):
+        print_error("some notebooks failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,25 +21,60 @@
 """Command-line utility for managing PDM lockfiles."""
 
 
-import argparse
+# Only what the check command needs is imported here, since PDM runs it before every
+# lock. The other commands import what they need when they run.
 import os
-import re
-import subprocess
 import sys
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
 
-from termcolor import colored
+if TYPE_CHECKING:
+    import argparse
 
 # The regex pattern for lockfiles
-PDM_LOCKFILE_PATTERN = re.compile(r"pdm\.([^.]+)\.([^.]+)\.lock")
+PDM_LOCKFILE_PATTERN = r"pdm\.([^.]+)\.([^.]+)\.lock"
 
 # The filename of the current lockfile that we symlink to the actual lockfile
 CURRENT_PDM_LOCKFILE = "pdm.lock"
 
+# The name of the group that holds the main dependencies
+DEFAULT_GROUP_NAME = "default"
 
-def print_info(*args) -> None:
-    """Function to print an info message to the console."""
-    print(colored("==> info:", "green"), *args)
+# The prefix of the comment line in each lockfile that records the hash of the
+# dependency sections of pyproject.toml it was locked from
+DEPENDENCIES_HASH_PREFIX = "# lockfile dependencies hash: "
+
+# The number of lines at the start of a lockfile that are searched for the hash
+DEPENDENCIES_HASH_MAX_LINE = 8
+
+# The environment variable that overrides where the wheelhouse is
+WHEELHOUSE_ENVIRONMENT_VARIABLE = "PDM_LOCKFILE_WHEELHOUSE"
+
+# The default wheelhouse, shared between every project of this user
+DEFAULT_WHEELHOUSE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "pdm-lockfile", "wheelhouse"
+)
+
+# The filename of the page in the wheelhouse that pip reads with --find-links
+WHEELHOUSE_INDEX_FILENAME = "index.html"
+
+# Installed files smaller than this are not hardlinked to the shared file store
+DEDUPLICATE_MIN_SIZE = 16 * 1024
+
+
+def colored(text: str, color: str) -> str:
+    """Colors text with termcolor, which is only imported once something is printed."""
+    from termcolor import colored as termcolor_colored
+
+    return termcolor_colored(text, color)
+
+
+def print_info(*args, color: bool = True) -> None:
+    """
+    Function to print an info message to the console.
+
+    Without color, termcolor is not imported.
+    """
+    print(colored("==> info:", "green") if color else "==> info:", *args)
 
 
 def print_note(*args) -> None:
@@ -85,6 +120,8 @@ def run_command(*args) -> bool:
 
     ``True`` if the command succeeded, ``False`` otherwise.
     """
+    import subprocess
+
     print_command_running(*args)
 
     result = subprocess.run(args)
@@ -125,9 +162,74 @@ def use_pdm_lockfile(group_name: str) -> None:
 
     os.symlink(get_pdm_lockfile_name(group_name), CURRENT_PDM_LOCKFILE)
 
+    # The directory keeps the same modification time if this runs within one tick
+    _pdm_lockfile_summaries.clear()
+
     print_info(f"lockfile set to group {group_name}")
 
 
+class PdmLockfileSummary(NamedTuple):
+    """
+    The lockfiles in the current directory.
+
+    ``current_filename`` is the name of the lockfile that ``pdm.lock`` links to, or
+    ``None`` if it is not a symlink. ``lockfiles`` holds a tuple
+    ``(is_currently_used, platform, group_name)`` for each lockfile, sorted by name.
+    """
+
+    current_filename: Optional[str]
+    lockfiles: List[Tuple[bool, str, str]]
+
+
+# The lockfile summary of the current directory, keyed by the directory and its
+# modification time
+_pdm_lockfile_summaries: Dict[Tuple[str, int], PdmLockfileSummary] = {}
+
+
+def get_pdm_lockfile_summary() -> PdmLockfileSummary:
+    """
+    Scans the current directory for lockfiles.
+
+    The directory is scanned in one pass and the ``pdm.lock`` symlink is only read
+    once. The summary is cached until an entry is added to or removed from the
+    directory, which changes its modification time.
+    """
+    import re
+
+    directory = os.getcwd()
+    key = (directory, os.stat(directory).st_mtime_ns)
+
+    if key in _pdm_lockfile_summaries:
+        return _pdm_lockfile_summaries[key]
+
+    current_filename = None
+    matches = []
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name == CURRENT_PDM_LOCKFILE:
+                if entry.is_symlink():
+                    current_filename = os.path.basename(os.readlink(entry.path))
+            else:
+                match = re.fullmatch(PDM_LOCKFILE_PATTERN, entry.name)
+
+                if match:
+                    matches.append(match)
+
+    summary = PdmLockfileSummary(
+        current_filename,
+        [
+            (match.string == current_filename, match.group(1), match.group(2))
+            for match in sorted(matches, key=lambda match: match.string)
+        ],
+    )
+
+    _pdm_lockfile_summaries.clear()
+    _pdm_lockfile_summaries[key] = summary
+
+    return summary
+
+
 def list_pdm_lockfiles() -> List[Tuple[bool, str, str]]:
     """
     Lists out the current available lockfiles.
@@ -136,21 +238,617 @@ def list_pdm_lockfiles() -> List[Tuple[bool, str, str]]:
 
     A list of tuples ``(is_currently_used, platform, group_name)``.
     """
-    results = []
+    return get_pdm_lockfile_summary().lockfiles
+
+
+def load_pyproject() -> Dict[str, Any]:
+    """Loads ``pyproject.toml``."""
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        import tomli as tomllib
+
+    with open("pyproject.toml", "rb") as file:
+        return tomllib.load(file)
+
+
+def get_pdm_groups() -> List[str]:
+    """
+    Gets the names of the groups that can be locked.
+
+    These are the default group and every group in ``[project.optional-dependencies]``
+    of ``pyproject.toml``.
+    """
+    pyproject = load_pyproject()
+
+    group_names = [DEFAULT_GROUP_NAME]
+
+    for group_name in pyproject.get("project", {}).get("optional-dependencies", {}):
+        if group_name not in group_names:
+            group_names.append(group_name)
+
+    return group_names
+
+
+def get_current_pdm_group() -> Optional[str]:
+    """Gets the name of the group whose lockfile is currently used, if any."""
+    import re
+
+    current_filename = get_pdm_lockfile_summary().current_filename
+
+    if current_filename is None:
+        return None
+
+    match = re.fullmatch(PDM_LOCKFILE_PATTERN, current_filename)
+
+    return match.group(2) if match else None
+
+
+def compute_dependencies_hash(pyproject: Dict[str, Any], group_name: str) -> str:
+    """
+    Computes a hash of the parts of ``pyproject.toml`` that a group's lockfile
+    depends on.
+
+    These are the main, optional and development dependencies, the required Python
+    version and the PDM package sources and resolution settings.
+    """
+    import hashlib
+    import json
+
+    project = pyproject.get("project", {})
+    pdm = pyproject.get("tool", {}).get("pdm", {})
+
+    sections = {
+        "group": group_name,
+        "dependencies": project.get("dependencies", []),
+        "requires-python": project.get("requires-python", ""),
+        "optional-dependencies": project.get("optional-dependencies", {}).get(
+            group_name, []
+        ),
+        "dev-dependencies": pdm.get("dev-dependencies", {}),
+        "source": pdm.get("source", []),
+        "resolution": pdm.get("resolution", {}),
+    }
+
+    text = json.dumps(sections, sort_keys=True)
+
+    return "sha256:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def read_dependencies_hash(lockfile_name: str) -> Optional[str]:
+    """
+    Reads the dependencies hash recorded in a lockfile.
+
+    Only the first few lines are read, so this is fast even for large lockfiles.
+    """
+    try:
+        with open(lockfile_name, "r") as file:
+            for _, line in zip(range(DEPENDENCIES_HASH_MAX_LINE), file):
+                if line.startswith(DEPENDENCIES_HASH_PREFIX):
+                    return line[len(DEPENDENCIES_HASH_PREFIX) :].strip()
+    except FileNotFoundError:
+        pass
+
+    return None
+
+
+def write_dependencies_hash(lockfile_name: str, dependencies_hash: str) -> None:
+    """Records a dependencies hash as a comment at the top of a lockfile."""
+    with open(lockfile_name, "r") as file:
+        lines = [line for line in file if not line.startswith(DEPENDENCIES_HASH_PREFIX)]
+
+    with open(lockfile_name, "w") as file:
+        file.write(f"{DEPENDENCIES_HASH_PREFIX}{dependencies_hash}\n")
+        file.writelines(lines)
+
+
+def get_pdm_group_status(pyproject: Dict[str, Any], group_name: str) -> str:
+    """
+    Gets the status of a group's lockfile for the current platform.
+
+    # Returns
+
+    ``"missing"`` if there is no lockfile, ``"stale"`` if its recorded hash does not
+    match ``pyproject.toml`` and ``"up to date"`` otherwise.
+    """
+    lockfile_name = get_pdm_lockfile_name(group_name)
+
+    if not os.path.exists(lockfile_name):
+        return "missing"
 
-    for filename in os.listdir():
-        match = PDM_LOCKFILE_PATTERN.match(filename)
-        if match:
-            is_current = (
-                os.path.exists(CURRENT_PDM_LOCKFILE)
-                and os.path.basename(os.readlink(CURRENT_PDM_LOCKFILE)) == filename
+    if read_dependencies_hash(lockfile_name) != compute_dependencies_hash(
+        pyproject, group_name
+    ):
+        return "stale"
+
+    return "up to date"
+
+
+def lock_pdm_groups(group_names: List[str]) -> Dict[str, Tuple[int, float]]:
+    """
+    Locks several groups concurrently.
+
+    Each group is resolved by its own ``pdm lock`` process. Their output is interleaved
+    line by line with each line prefixed by the group name. The dependencies hash is
+    recorded in each lockfile that is successfully locked.
+
+    # Returns
+
+    A dictionary from group name to ``(exit_status, seconds)``.
+    """
+    import concurrent.futures
+    import subprocess
+    import threading
+    import time
+
+    pyproject = load_pyproject()
+    print_lock = threading.Lock()
+    prefix_width = max(len(group_name) for group_name in group_names)
+
+    def lock_pdm_group(group_name: str) -> Tuple[int, float]:
+        args = [
+            "pdm",
+            "lock",
+            "-G",
+            group_name,
+            "-L",
+            get_pdm_lockfile_name(group_name),
+            "--no-cross-platform",
+            "--skip=:pre",
+        ]
+        prefix = colored(f"  [{group_name.ljust(prefix_width)}]", "cyan")
+        dependencies_hash = compute_dependencies_hash(pyproject, group_name)
+
+        with print_lock:
+            print_command_running(*args)
+
+        start = time.perf_counter()
+
+        process = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+
+        assert process.stdout is not None
+
+        for line in process.stdout:
+            with print_lock:
+                print(prefix, line.rstrip())
+
+        exit_status = process.wait()
+
+        if exit_status == 0:
+            write_dependencies_hash(
+                get_pdm_lockfile_name(group_name), dependencies_hash
+            )
+
+        return exit_status, time.perf_counter() - start
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(group_names)
+    ) as executor:
+        results = executor.map(lock_pdm_group, group_names)
+
+        return dict(zip(group_names, results))
+
+
+def get_wheelhouse_dir() -> str:
+    """
+    Gets the wheelhouse directory.
+
+    It is shared between projects and can be set with the ``PDM_LOCKFILE_WHEELHOUSE``
+    environment variable.
+    """
+    return os.environ.get(WHEELHOUSE_ENVIRONMENT_VARIABLE, DEFAULT_WHEELHOUSE_DIR)
+
+
+def export_requirements(group_name: str) -> Optional[str]:
+    """
+    Exports a group's lockfile as a requirements file with hashes.
+
+    # Returns
+
+    The contents of the requirements file, or ``None`` if the export failed.
+    """
+    import subprocess
+
+    args = [
+        "pdm",
+        "export",
+        "-G",
+        group_name,
+        "-L",
+        get_pdm_lockfile_name(group_name),
+        "-f",
+        "requirements",
+    ]
+
+    print_command_running(*args)
+
+    result = subprocess.run(args, stdout=subprocess.PIPE, text=True)
+
+    print_command_exit_status(result.returncode)
+
+    return result.stdout if result.returncode == 0 else None
+
+
+def parse_requirements(text: str) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Parses an exported requirements file.
+
+    # Returns
+
+    A tuple ``(options, requirements)`` where ``options`` are option lines such as
+    ``--extra-index-url`` and ``requirements`` maps each requirement to its hashes.
+    """
+    import re
+
+    options = []
+    requirements: Dict[str, List[str]] = {}
+
+    for line in text.replace("\\\n", " ").splitlines():
+        line = line.strip()
+
+        if line == "" or line.startswith("#"):
+            continue
+
+        if line.startswith("-"):
+            options.append(line)
+        else:
+            requirement, _, hashes = line.partition(" --hash=")
+            requirements[requirement.strip()] = re.findall(
+                r"sha256:([0-9a-f]{64})", hashes
             )
-            results.append((is_current, match.group(1), match.group(2)))
 
-    return results
+    return options, requirements
+
+
+def format_requirements(options: List[str], requirements: Dict[str, List[str]]) -> str:
+    """Formats a requirements file with hashes."""
+    lines = list(options)
+
+    for requirement, hashes in requirements.items():
+        lines.append(
+            " ".join(
+                [requirement] + [f"--hash=sha256:{file_hash}" for file_hash in hashes]
+            )
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def get_wheelhouse_manifest_path() -> str:
+    """
+    Gets the path of the wheelhouse manifest for the current interpreter.
+
+    A requirement can have many locked files, one per platform and Python version.
+    The manifest records which of them pip picked for this interpreter, so
+    requirements that are already in the wheelhouse are not downloaded again.
+    """
+    import sysconfig
+
+    tag = f"{sys.implementation.cache_tag}-{sysconfig.get_platform()}"
+
+    return os.path.join(get_wheelhouse_dir(), "manifests", f"{tag}.json")
+
+
+def load_wheelhouse_manifest() -> Dict[str, str]:
+    """Loads the wheelhouse manifest for the current interpreter."""
+    import json
+
+    try:
+        with open(get_wheelhouse_manifest_path(), "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def get_wheelhouse_file_dir(file_hash: str) -> str:
+    """Gets the directory of a file in the wheelhouse, which is keyed by its hash."""
+    return os.path.join(get_wheelhouse_dir(), "sha256", file_hash[:2], file_hash)
+
+
+def write_atomically(path: str, text: str) -> None:
+    """Writes a file so that concurrent readers never see it half written."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(temporary_path, "w") as file:
+        file.write(text)
 
+    os.replace(temporary_path, path)
 
-def command_check(arguments: argparse.Namespace) -> None:
+
+def write_wheelhouse_index() -> None:
+    """
+    Writes an HTML page that links to every file in the wheelhouse.
+
+    pip reads it with ``--find-links``, which does not search subdirectories.
+    """
+    links = []
+
+    for directory, _, filenames in os.walk(
+        os.path.join(get_wheelhouse_dir(), "sha256")
+    ):
+        for filename in sorted(filenames):
+            path = os.path.relpath(
+                os.path.join(directory, filename), get_wheelhouse_dir()
+            )
+            file_hash = os.path.basename(directory)
+            links.append(f'<a href="{path}#sha256={file_hash}">{filename}</a><br>')
+
+    write_atomically(
+        os.path.join(get_wheelhouse_dir(), WHEELHOUSE_INDEX_FILENAME),
+        "<!DOCTYPE html>\n<html><body>\n"
+        + "\n".join(sorted(links))
+        + "\n</body></html>\n",
+    )
+
+
+def hash_file(path: str) -> bytes:
+    """Computes the SHA-256 digest of a file."""
+    import hashlib
+
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.digest()
+
+
+def ensure_pip() -> bool:
+    """
+    Ensures that pip is installed in the current interpreter's environment.
+
+    PDM creates venvs without pip unless asked to, so pip is installed from the copy
+    bundled with Python if it is missing. This needs no network access.
+
+    # Returns
+
+    ``True`` if pip is installed, ``False`` otherwise.
+    """
+    import importlib.util
+
+    if importlib.util.find_spec("pip") is not None:
+        return True
+
+    return run_command(sys.executable, "-m", "ensurepip", "--default-pip")
+
+
+def populate_wheelhouse(group_name: str) -> bool:
+    """
+    Downloads every file of a group's lockfile that is not yet in the wheelhouse.
+
+    Files are verified against the locked hashes and stored under their hash.
+
+    # Returns
+
+    ``True`` if the wheelhouse has every file needed by the group, ``False``
+    otherwise.
+    """
+    import json
+    import shutil
+
+    text = export_requirements(group_name)
+
+    if text is None:
+        return False
+
+    options, requirements = parse_requirements(text)
+    manifest = load_wheelhouse_manifest()
+
+    missing_requirements = {
+        requirement: hashes
+        for requirement, hashes in requirements.items()
+        if manifest.get(requirement) not in hashes
+        or not os.path.isdir(get_wheelhouse_file_dir(manifest[requirement]))
+    }
+
+    print_info(
+        f"{len(requirements) - len(missing_requirements)} of {len(requirements)} "
+        "requirements already in the wheelhouse"
+    )
+
+    if len(missing_requirements) == 0:
+        return True
+
+    download_dir = os.path.join(get_wheelhouse_dir(), f"download-{os.getpid()}")
+    requirements_path = os.path.join(download_dir, "requirements.txt")
+    write_atomically(
+        requirements_path, format_requirements(options, missing_requirements)
+    )
+
+    try:
+        if not ensure_pip() or not run_command(
+            sys.executable,
+            "-m",
+            "pip",
+            "download",
+            "--no-deps",
+            "--require-hashes",
+            "-r",
+            requirements_path,
+            "-d",
+            download_dir,
+        ):
+            return False
+
+        downloaded: Dict[str, str] = {}
+        requirements_by_hash = {
+            file_hash: requirement
+            for requirement, hashes in missing_requirements.items()
+            for file_hash in hashes
+        }
+
+        for filename in os.listdir(download_dir):
+            path = os.path.join(download_dir, filename)
+            file_hash = hash_file(path).hex()
+
+            if file_hash not in requirements_by_hash:
+                continue
+
+            os.makedirs(get_wheelhouse_file_dir(file_hash), exist_ok=True)
+            os.replace(path, os.path.join(get_wheelhouse_file_dir(file_hash), filename))
+
+            downloaded[requirements_by_hash[file_hash]] = file_hash
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+    # Reload the manifest in case another project updated it in the meantime
+    manifest = load_wheelhouse_manifest()
+    manifest.update(downloaded)
+    write_atomically(get_wheelhouse_manifest_path(), json.dumps(manifest, indent=2))
+    write_wheelhouse_index()
+
+    return True
+
+
+def install_from_wheelhouse(group_name: str) -> bool:
+    """
+    Installs a group's locked dependencies from the wheelhouse with no network access.
+
+    pip checks every file against the locked hashes. It is installed first if the venv
+    does not have it (see `ensure_pip`). The project itself is not installed, since
+    building it would need the build backend from an index. Files in site-packages are
+    then deduplicated against the wheelhouse file store.
+
+    # Returns
+
+    ``True`` if the installation succeeded, ``False`` otherwise.
+    """
+    text = export_requirements(group_name)
+
+    if text is None:
+        return False
+
+    _, requirements = parse_requirements(text)
+    requirements_path = os.path.join(get_wheelhouse_dir(), f"install-{os.getpid()}.txt")
+    write_atomically(requirements_path, format_requirements([], requirements))
+
+    try:
+        if not ensure_pip() or not run_command(
+            sys.executable,
+            "-m",
+            "pip",
+            "install",
+            "--no-index",
+            "--find-links",
+            os.path.join(get_wheelhouse_dir(), WHEELHOUSE_INDEX_FILENAME),
+            "--no-deps",
+            "--require-hashes",
+            "-r",
+            requirements_path,
+        ):
+            return False
+    finally:
+        os.remove(requirements_path)
+
+    linked_count, linked_size = deduplicate_site_packages()
+
+    print_info(
+        f"hardlinked {linked_count} files ({linked_size / 1024 ** 2:.1f} MiB) to the "
+        "shared file store"
+    )
+
+    return True
+
+
+def deduplicate_site_packages(
+    site_packages_dir: Optional[str] = None,
+) -> Tuple[int, int]:
+    """
+    Replaces installed files with hardlinks to a store shared between projects.
+
+    Files are keyed by the hashes in each package's ``RECORD`` and are only added to
+    the store or linked to it if their contents still match, so an edited or
+    corrupted file is never shared. Small files and files outside site-packages, such
+    as scripts whose shebang points into this venv, are left alone. Files that cannot
+    be linked are skipped, and nothing is linked if the store is on a different
+    filesystem.
+
+    Site-packages defaults to the one of the current interpreter.
+
+    # Returns
+
+    A tuple ``(file_count, byte_count)`` of the files that now share storage.
+    """
+    import base64
+    import csv
+    import errno
+    import glob
+    import sysconfig
+
+    if site_packages_dir is None:
+        site_packages_dir = sysconfig.get_paths()["purelib"]
+
+    store_dir = os.path.join(get_wheelhouse_dir(), "files")
+    linked_count = 0
+    linked_size = 0
+
+    for record_path in glob.glob(
+        os.path.join(site_packages_dir, "*.dist-info", "RECORD")
+    ):
+        with open(record_path, "r", newline="") as file:
+            rows = list(csv.reader(file))
+
+        for row in rows:
+            if (
+                len(row) < 3
+                or not row[1].startswith("sha256=")
+                or row[0].startswith("..")
+            ):
+                continue
+
+            path = os.path.join(site_packages_dir, row[0])
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            if stat.st_size < DEDUPLICATE_MIN_SIZE:
+                continue
+
+            record_hash = row[1][len("sha256=") :]
+            store_path = os.path.join(store_dir, record_hash[:2], record_hash)
+
+            try:
+                if os.path.exists(store_path) and os.path.samefile(path, store_path):
+                    linked_count += 1
+                    linked_size += stat.st_size
+                    continue
+
+                digest = hash_file(path)
+
+                if (
+                    base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+                    != record_hash
+                ):
+                    continue
+
+                if os.path.exists(store_path):
+                    temporary_path = f"{path}.{os.getpid()}.tmp"
+                    os.link(store_path, temporary_path)
+                    os.replace(temporary_path, path)
+                else:
+                    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+                    os.link(path, store_path)
+            except OSError as error:
+                if error.errno == errno.EXDEV:
+                    # The store is on a different filesystem, so no file can be linked
+                    return linked_count, linked_size
+
+                continue
+
+            linked_count += 1
+            linked_size += stat.st_size
+
+    return linked_count, linked_size
+
+
+def command_check(arguments: Optional["argparse.Namespace"]) -> None:
     """Command to check that the lockfile is set up correctly."""
     if not os.path.exists(CURRENT_PDM_LOCKFILE):
         print_error(f"no lockfile set")
@@ -171,10 +869,12 @@ def command_check(arguments: argparse.Namespace) -> None:
         print_error(f"'{CURRENT_PDM_LOCKFILE}' must be a symbolic link")
         sys.exit(1)
 
-    print_info(f"'{CURRENT_PDM_LOCKFILE}' is set up correctly")
+    # PDM runs this before every lock, so success is printed without color to avoid
+    # importing termcolor
+    print_info(f"'{CURRENT_PDM_LOCKFILE}' is set up correctly", color=False)
 
 
-def command_list(arguments: argparse.Namespace) -> None:
+def command_list(arguments: "argparse.Namespace") -> None:
     """Command to list the available lockfiles."""
     pdm_lockfiles = list_pdm_lockfiles()
 
@@ -191,7 +891,7 @@ def command_list(arguments: argparse.Namespace) -> None:
         sys.exit(1)
 
 
-def command_use(arguments: argparse.Namespace) -> None:
+def command_use(arguments: "argparse.Namespace") -> None:
     """Command to use a lockfile."""
     pdm_lockfiles = list_pdm_lockfiles()
 
@@ -228,46 +928,206 @@ def command_use(arguments: argparse.Namespace) -> None:
     use_pdm_lockfile(arguments.group_name)
 
 
-def command_add(arguments: argparse.Namespace) -> None:
-    """Command to add a new lockfile."""
+def command_status(arguments: "argparse.Namespace") -> None:
+    """
+    Command to list which lockfiles for this platform need to be relocked.
+
+    Exits with an error if any existing lockfile is stale. Missing lockfiles are only
+    reported, since not every group has to be locked on every platform.
+    """
+    pyproject = load_pyproject()
+    stale_group_names = []
+
+    print_info(f"lockfiles for platform {sys.platform}:")
+
+    for group_name in get_pdm_groups():
+        status = get_pdm_group_status(pyproject, group_name)
+
+        if status == "up to date":
+            color = "green"
+        elif status == "stale":
+            color = "red"
+            stale_group_names.append(group_name)
+        else:
+            color = "yellow"
+
+        print(f"  {group_name}: {colored(status, color)}")
+
+    if len(stale_group_names) > 0:
+        print()
+        print_error(f"stale lockfiles for {', '.join(stale_group_names)}")
+        print()
+        print_fix(f"run this command to relock them:")
+        print_fix(f"  $ pdm run lockfile add {' '.join(stale_group_names)}")
+        sys.exit(1)
+
+
+def command_stamp(arguments: "argparse.Namespace") -> None:
+    """
+    Command to record that lockfiles are up to date with ``pyproject.toml``.
+
+    This is for lockfiles that were locked by ``pdm lock`` or ``pdm install`` directly
+    rather than by the add command, such as the one created when the project is
+    generated, so that the status command does not report them as stale.
+    """
+    pyproject = load_pyproject()
+
+    for group_name in arguments.group_names:
+        lockfile_name = get_pdm_lockfile_name(group_name)
+
+        if not os.path.exists(lockfile_name):
+            print_error(f"group {group_name} has no lockfile for this platform")
+            sys.exit(1)
+
+        write_dependencies_hash(
+            lockfile_name, compute_dependencies_hash(pyproject, group_name)
+        )
+
+    print_info(f"recorded dependencies hash for {', '.join(arguments.group_names)}")
+
+
+def command_wheelhouse(arguments: "argparse.Namespace") -> None:
+    """Command to download the dependencies of lockfiles into the wheelhouse."""
+    group_names = arguments.group_names or [
+        get_current_pdm_group() or DEFAULT_GROUP_NAME
+    ]
+
+    print_info(f"using wheelhouse at {get_wheelhouse_dir()}")
+
+    failed_group_names = [
+        group_name for group_name in group_names if not populate_wheelhouse(group_name)
+    ]
+
+    if len(failed_group_names) > 0:
+        print_error(
+            f"unable to download dependencies for {', '.join(failed_group_names)}"
+        )
+        sys.exit(1)
+
+    print_info("wheelhouse is up to date")
+
+
+def command_add(arguments: "argparse.Namespace") -> None:
+    """
+    Command to add or refresh lockfiles.
+
+    Several groups are locked concurrently. Groups whose lockfile is up to date with
+    ``pyproject.toml`` are skipped unless ``--force`` is given. Dependencies are then
+    installed once, for the active group. When a single group is given, it becomes the
+    active group. Otherwise the currently used group stays active.
+
+    With ``--wheelhouse``, dependencies are downloaded into the wheelhouse and
+    installed from there. With ``--offline``, they are installed from the wheelhouse
+    without any network access, which needs every given lockfile to be up to date.
+    """
     ensure_pdm_lockfile_valid()
 
-    print_info(f"adding lockfile for group '{arguments.group_name}'...")
+    if arguments.all:
+        group_names = get_pdm_groups()
+    else:
+        group_names = list(dict.fromkeys(arguments.group_names))
 
-    result = run_command(
-        "pdm",
-        "lock",
-        "-G",
-        str(arguments.group_name),
-        "-L",
-        get_pdm_lockfile_name(arguments.group_name),
-        "--no-cross-platform",
-        "--skip=:pre",
-    )
+    if len(group_names) == 0:
+        print_error("no groups given")
+        print()
+        print_fix(f"run this command with one or more groups:")
+        print_fix(f"  $ pdm run lockfile add <GROUP>...")
+        print_fix()
+        print_fix(f"or run this command to add lockfiles for every group:")
+        print_fix(f"  $ pdm run lockfile add --all")
+        sys.exit(1)
 
-    if result:
-        print_info("successfully added lockfile")
+    if arguments.force and not arguments.offline:
+        stale_group_names = group_names
     else:
-        print_error("unable to add lockfile")
+        pyproject = load_pyproject()
+        stale_group_names = [
+            group_name
+            for group_name in group_names
+            if get_pdm_group_status(pyproject, group_name) != "up to date"
+        ]
+
+    if arguments.offline and len(stale_group_names) > 0:
+        print_error(
+            f"lockfiles for {', '.join(stale_group_names)} are not up to date and "
+            "cannot be locked offline"
+        )
+        print()
+        print_fix(f"run this command while online to lock them:")
+        print_fix(
+            f"  $ pdm run lockfile add --wheelhouse {' '.join(stale_group_names)}"
+        )
         sys.exit(1)
 
-    use_pdm_lockfile(arguments.group_name)
+    if len(stale_group_names) > 0:
+        print_info(f"adding lockfiles for groups {', '.join(stale_group_names)}...")
+
+        results = lock_pdm_groups(stale_group_names)
+    else:
+        results = {}
+
+    print_info("summary:")
+
+    for group_name in group_names:
+        if group_name not in results:
+            print(f"  {group_name}: {colored('up to date', 'green')}")
+            continue
+
+        exit_status, seconds = results[group_name]
+
+        if exit_status == 0:
+            status = colored("locked", "green")
+        else:
+            status = colored(f"failed (exit status: {exit_status})", "red")
+
+        print(f"  {group_name}: {status} in {seconds:.1f}s")
 
-    result = run_command("pdm", "install", "--skip=:pre")
+    failed_group_names = [
+        group_name
+        for group_name, (exit_status, _) in results.items()
+        if exit_status != 0
+    ]
 
-    if result:
-        print_info("successfully added lockfile")
+    active_group_name = get_current_pdm_group()
+
+    if len(group_names) == 1 or active_group_name is None:
+        active_group_name = group_names[0]
+
+    if active_group_name in group_names and active_group_name not in failed_group_names:
+        use_pdm_lockfile(active_group_name)
+
+        if arguments.offline or arguments.wheelhouse:
+            installed = (
+                arguments.offline or populate_wheelhouse(active_group_name)
+            ) and install_from_wheelhouse(active_group_name)
+        else:
+            installed = run_command("pdm", "install", "--skip=:pre")
+
+        if installed:
+            print_info(f"successfully installed dependencies for {active_group_name}")
+        else:
+            print_error("unable to install dependencies")
+            sys.exit(1)
     else:
-        print_error("unable to add lockfile")
+        print_info(
+            f"not installing because active group {active_group_name} was not locked"
+        )
+
+    if len(failed_group_names) > 0:
+        print_error(f"unable to add lockfiles for {', '.join(failed_group_names)}")
         sys.exit(1)
 
+    print_info("successfully added lockfiles")
+
 
-def create_argument_parser() -> argparse.ArgumentParser:
+def create_argument_parser() -> "argparse.ArgumentParser":
     """
     Creates an argument parser.
 
     This defines the command-line arguments for this script.
     """
+    import argparse
+
     argument_parser = argparse.ArgumentParser()
 
     argument_subparsers = argument_parser.add_subparsers(title="subcommands")
@@ -283,16 +1143,52 @@ def create_argument_parser() -> argparse.ArgumentParser:
 
     argument_parser_use.add_argument("group_name", type=str)
 
+    argument_parser_status = argument_subparsers.add_parser("status")
+    argument_parser_status.set_defaults(func=command_status)
+
+    argument_parser_stamp = argument_subparsers.add_parser("stamp")
+    argument_parser_stamp.set_defaults(func=command_stamp)
+
+    argument_parser_stamp.add_argument("group_names", type=str, nargs="+")
+
+    argument_parser_wheelhouse = argument_subparsers.add_parser("wheelhouse")
+    argument_parser_wheelhouse.set_defaults(func=command_wheelhouse)
+
+    argument_parser_wheelhouse.add_argument("group_names", type=str, nargs="*")
+
     argument_parser_add = argument_subparsers.add_parser("add")
     argument_parser_add.set_defaults(func=command_add)
 
-    argument_parser_add.add_argument("group_name", type=str)
+    argument_parser_add.add_argument("group_names", type=str, nargs="*")
+    argument_parser_add.add_argument(
+        "--all", action="store_true", help="add lockfiles for every group"
+    )
+    argument_parser_add.add_argument(
+        "--force",
+        action="store_true",
+        help="relock groups even if their lockfile is up to date",
+    )
+    argument_parser_add.add_argument(
+        "--wheelhouse",
+        action="store_true",
+        help="download dependencies into the wheelhouse and install from there",
+    )
+    argument_parser_add.add_argument(
+        "--offline",
+        action="store_true",
+        help="install from the wheelhouse without network access",
+    )
 
     return argument_parser
 
 
 def main() -> None:
     """Main function."""
+    # PDM runs the check command before every lock, so it skips the argument parser
+    if sys.argv[1:] == ["check"]:
+        command_check(None)
+        return
+
     # Create argument parser
     argument_parser = create_argument_parser()
 
@@ -0,0 +1,106 @@
+# Copyright 2023 Sophie Katz
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the “Software”), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Pytest configuration for the integration tests.
+
+Test cases are run slowest first, so that the long ones start right away when the
+matrix is spread over pytest-xdist workers with ``-n auto``.
+"""
+
+
+import os
+from typing import Dict, List
+
+import pytest
+
+from tests.testing_utils import CACHE_DIRECTORY
+
+# The key in the pytest cache that holds the duration of each test case
+DURATIONS_CACHE_KEY = "copier-ml/durations"
+
+# The durations recorded by this run
+_durations: Dict[str, float] = {}
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Shares the venv snapshot cache between every test case and worker."""
+    os.environ.setdefault(
+        "COPIER_ML_VENV_CACHE_DIR", os.path.join(CACHE_DIRECTORY, "venvs")
+    )
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: List[pytest.Item]
+) -> None:
+    """Sorts test cases from slowest to fastest.
+
+    Durations recorded by previous runs are used where known. Other test cases are
+    estimated from their ``cost`` marker, scaled by the average duration per unit of
+    cost of the known test cases. The order is left alone if the cache provider is
+    disabled, for example with ``-p no:cacheprovider``.
+    """
+    cache = getattr(config, "cache", None)
+
+    if cache is None:
+        return
+
+    durations: Dict[str, float] = cache.get(DURATIONS_CACHE_KEY, {})
+
+    def get_cost(item: pytest.Item) -> float:
+        marker = item.get_closest_marker("cost")
+
+        return float(marker.args[0]) if marker is not None else 0.0
+
+    known_items = [item for item in items if item.nodeid in durations]
+    known_cost = sum(get_cost(item) for item in known_items)
+    seconds_per_cost = (
+        sum(durations[item.nodeid] for item in known_items) / known_cost
+        if known_cost > 0
+        else 1.0
+    )
+
+    def get_estimated_duration(item: pytest.Item) -> float:
+        if item.nodeid in durations:
+            return durations[item.nodeid]
+
+        return get_cost(item) * seconds_per_cost
+
+    items.sort(key=get_estimated_duration, reverse=True)
+
+
+def pytest_runtest_logreport(report: pytest.TestReport) -> None:
+    """Records how long each test case took."""
+    if report.when == "call" and report.passed:
+        _durations[report.nodeid] = report.duration
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    """Saves the recorded durations for the next run.
+
+    Only the main process saves them, since it receives the reports of every worker.
+    Nothing is saved if the cache provider is disabled.
+    """
+    cache = getattr(session.config, "cache", None)
+
+    if hasattr(session.config, "workerinput") or cache is None:
+        return
+
+    durations = cache.get(DURATIONS_CACHE_KEY, {})
+    durations.update(_durations)
+    cache.set(DURATIONS_CACHE_KEY, durations)
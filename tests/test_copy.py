@@ -23,17 +23,24 @@ Then tests rendered files against expected results.
 """
 
 
+import json
 import os
 import re
 import sys
 
 import copier
+import plumbum
 import pytest
-from typing import Dict
+from typing import Dict, List, Tuple
+import concurrent.futures
 import subprocess
 
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
 from tests.testing_utils import (
-    COPIES_DIRECTORY,
     DirectoryTest,
     FileTest,
     before_integration_test,
@@ -147,6 +154,14 @@ def _test_pyproject_toml(text: str) -> None:
     assert PYPROJECT_PATTERN_BAD_SPACING.search(text) is None
 
 
+def _test_file_toml_valid(text: str) -> None:
+    tomllib.loads(text)
+
+
+def _test_file_json_valid(text: str) -> None:
+    json.loads(text)
+
+
 PYTHON_VERSION_WITH_DASH_PATTERN = re.compile(r"3-[0-9]+")
 
 
@@ -154,12 +169,28 @@ def _test_file_python_version_with_dot(text: str) -> None:
     assert PYTHON_VERSION_WITH_DASH_PATTERN.search(text) is None
 
 
-def _test_file_formatting_black(path: str) -> None:
-    result = subprocess.run(["black", "--check", path])
+def _test_files_formatting_black(paths: List[str]) -> None:
+    result = subprocess.run(["black", "--check", *paths])
 
     assert result.returncode == 0
 
 
+def _create_file_test_python(license: str) -> FileTest:
+    return FileTest(
+        on_text=[
+            lambda text: _test_file_starts_with_license_hashes(license != "none", text),
+            lambda text: _test_file_license_content(license, text),
+            lambda text: _test_file_two_newlines_after_license_hashes(
+                license != "none", text
+            ),
+            _test_file_python_version_with_dot,
+        ],
+        on_batch=[
+            _test_files_formatting_black,
+        ],
+    )
+
+
 def _create_directory_test_minimal(license: str, cuda_version: str) -> DirectoryTest:
     result = DirectoryTest(
         child_files={
@@ -201,6 +232,7 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                         license != "none", text
                     ),
                     _test_pyproject_toml,
+                    _test_file_toml_valid,
                     _test_file_python_version_with_dot,
                 ]
             ),
@@ -232,10 +264,13 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                             ),
                             _test_file_python_version_with_dot,
                         ],
-                        on_path=[
-                            _test_file_formatting_black,
+                        on_batch=[
+                            _test_files_formatting_black,
                         ],
                     ),
+                    "conftest.py": _create_file_test_python(license),
+                    "pipeline.py": _create_file_test_python(license),
+                    "pipeline_test.py": _create_file_test_python(license),
                     "settings.py": FileTest(
                         on_text=[
                             lambda text: _test_file_starts_with_license_hashes(
@@ -247,8 +282,8 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                             ),
                             _test_file_python_version_with_dot,
                         ],
-                        on_path=[
-                            _test_file_formatting_black,
+                        on_batch=[
+                            _test_files_formatting_black,
                         ],
                     ),
                 },
@@ -268,8 +303,8 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                                     ),
                                     _test_file_python_version_with_dot,
                                 ],
-                                on_path=[
-                                    _test_file_formatting_black,
+                                on_batch=[
+                                    _test_files_formatting_black,
                                 ],
                             ),
                             "download.py": FileTest(
@@ -285,8 +320,8 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                                     ),
                                     _test_file_python_version_with_dot,
                                 ],
-                                on_path=[
-                                    _test_file_formatting_black,
+                                on_batch=[
+                                    _test_files_formatting_black,
                                 ],
                             ),
                             "extract_test.py": FileTest(
@@ -302,8 +337,8 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                                     ),
                                     _test_file_python_version_with_dot,
                                 ],
-                                on_path=[
-                                    _test_file_formatting_black,
+                                on_batch=[
+                                    _test_files_formatting_black,
                                 ],
                             ),
                             "extract.py": FileTest(
@@ -319,8 +354,8 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                                     ),
                                     _test_file_python_version_with_dot,
                                 ],
-                                on_path=[
-                                    _test_file_formatting_black,
+                                on_batch=[
+                                    _test_files_formatting_black,
                                 ],
                             ),
                             "project_paths_test.py": FileTest(
@@ -350,8 +385,8 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                                     ),
                                     _test_file_python_version_with_dot,
                                 ],
-                                on_path=[
-                                    _test_file_formatting_black,
+                                on_batch=[
+                                    _test_files_formatting_black,
                                 ],
                             ),
                             "__init__.py": FileTest(
@@ -367,10 +402,32 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                                     ),
                                     _test_file_python_version_with_dot,
                                 ],
-                                on_path=[
-                                    _test_file_formatting_black,
+                                on_batch=[
+                                    _test_files_formatting_black,
                                 ],
                             ),
+                            "fixture_server_test.py": _create_file_test_python(license),
+                            "fixture_server.py": _create_file_test_python(license),
+                            "cpus_test.py": _create_file_test_python(license),
+                            "cpus.py": _create_file_test_python(license),
+                            "sweep_test.py": _create_file_test_python(license),
+                            "resource_monitor.py": _create_file_test_python(license),
+                            "resource_monitor_test.py": _create_file_test_python(
+                                license
+                            ),
+                            "sweep.py": _create_file_test_python(license),
+                            "model_store.py": _create_file_test_python(license),
+                            "model_store_test.py": _create_file_test_python(license),
+                            "dataframes.py": _create_file_test_python(license),
+                            "dataframes_test.py": _create_file_test_python(license),
+                            "parallel.py": _create_file_test_python(license),
+                            "parallel_test.py": _create_file_test_python(license),
+                            "line_index.py": _create_file_test_python(license),
+                            "line_index_test.py": _create_file_test_python(license),
+                            "fingerprint.py": _create_file_test_python(license),
+                            "fingerprint_test.py": _create_file_test_python(license),
+                            "stage_graph.py": _create_file_test_python(license),
+                            "stage_graph_test.py": _create_file_test_python(license),
                         }
                     )
                 },
@@ -384,6 +441,7 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                         child_files={
                             "example_experiment.ipynb": FileTest(
                                 on_text=[
+                                    _test_file_json_valid,
                                     _test_file_python_version_with_dot,
                                 ]
                             ),
@@ -393,6 +451,7 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
                         child_files={
                             "example_tutorial.ipynb": FileTest(
                                 on_text=[
+                                    _test_file_json_valid,
                                     _test_file_python_version_with_dot,
                                 ]
                             ),
@@ -402,9 +461,19 @@ def _create_directory_test_minimal(license: str, cuda_version: str) -> Directory
             ),
             "scripts": DirectoryTest(
                 child_files={
+                    "lint.py": FileTest(
+                        on_batch=[
+                            _test_files_formatting_black,
+                        ]
+                    ),
+                    "notebooks.py": FileTest(
+                        on_batch=[
+                            _test_files_formatting_black,
+                        ]
+                    ),
                     "pdm_lockfile.py": FileTest(
-                        on_path=[
-                            _test_file_formatting_black,
+                        on_batch=[
+                            _test_files_formatting_black,
                         ]
                     ),
                 }
@@ -432,15 +501,53 @@ def _create_directory_test_maximal(license: str, cuda_version: str) -> Directory
         "comet.py"
     ] = FileTest()
 
+    minimal.child_directories["language_model"].child_directories["utils"].child_files[
+        "scikit_learn_test.py"
+    ] = _create_file_test_python(license)
+
+    minimal.child_directories["language_model"].child_directories["utils"].child_files[
+        "scikit_learn.py"
+    ] = _create_file_test_python(license)
+
+    minimal.child_directories["language_model"].child_directories["utils"].child_files[
+        "torch_model_store_test.py"
+    ] = _create_file_test_python(license)
+
+    minimal.child_directories["language_model"].child_directories["utils"].child_files[
+        "torch_model_store.py"
+    ] = _create_file_test_python(license)
+
+    minimal.child_directories["language_model"].child_directories[
+        "data"
+    ] = DirectoryTest(
+        child_files={
+            "__init__.py": _create_file_test_python(license),
+            "datamodule_test.py": _create_file_test_python(license),
+            "datamodule.py": _create_file_test_python(license),
+            "tf_pipeline_test.py": _create_file_test_python(license),
+            "tf_pipeline.py": _create_file_test_python(license),
+        }
+    )
+
     return minimal
 
 
+def _run_check(args: List[str], copy_directory: str) -> Tuple[int, str]:
+    result = subprocess.run(
+        args,
+        cwd=copy_directory,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+    return result.returncode, result.stdout
+
+
 def _run_copy_test(
     copy_name: str, data: Dict[str, str], directory_test: DirectoryTest
 ) -> None:
-    before_integration_test(copy_name)
-
-    copy_directory = os.path.join(COPIES_DIRECTORY, copy_name)
+    copy_directory = before_integration_test(copy_name)
 
     copier.run_copy(
         ".",
@@ -452,74 +559,102 @@ def _run_copy_test(
 
     directory_test.run(copy_directory)
 
-    result = subprocess.run(["pdm", "run", "lint:mypy"], cwd=copy_directory)
-
-    assert result.returncode == 0
-
-    result = subprocess.run(["pdm", "run", "lint:pycodestyle"], cwd=copy_directory)
-
-    assert result.returncode == 0
+    # These checks only read the copy, so they can run at the same time.
+    checks = [
+        ["pdm", "run", "lockfile", "status"],
+        ["pdm", "run", "lint:mypy"],
+        ["pdm", "run", "lint:pycodestyle"],
+        ["pdm", "run", "lint:pydocstyle"],
+        ["pdm", "run", "lint:bandit"],
+        ["pdm", "run", "lint:vulture"],
+        ["pdm", "run", "lint:isort", "--df"],
+        ["pdm", "run", "format:black", "--diff"],
+        ["pdm", "run", "format:isort", "-c"],
+    ]
 
-    result = subprocess.run(["pdm", "run", "lint:pydocstyle"], cwd=copy_directory)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        results = list(
+            executor.map(lambda args: _run_check(args, copy_directory), checks)
+        )
 
-    assert result.returncode == 0
+    for args, (returncode, output) in zip(checks, results):
+        assert returncode == 0, f"{' '.join(args)} failed:\n{output}"
 
-    result = subprocess.run(["pdm", "run", "lint:bandit"], cwd=copy_directory)
+    result = subprocess.run(["pdm", "run", "format"], cwd=copy_directory)
 
     assert result.returncode == 0
 
-    result = subprocess.run(
-        ["pdm", "run", "lint:vulture"],
-        cwd=copy_directory,
-    )
+    result = subprocess.run(["pdm", "run", "test"], cwd=copy_directory)
 
     assert result.returncode == 0
 
-    result = subprocess.run(["pdm", "run", "lint:isort", "--df"], cwd=copy_directory)
 
-    assert result.returncode == 0
+def _remove_post_copy_outputs(
+    directory_test: DirectoryTest, cuda_version: str
+) -> DirectoryTest:
+    for child_file_name in [
+        ".pdm-python",
+        f"pdm.{sys.platform}.{cuda_version}.lock",
+        "pdm.lock",
+    ]:
+        del directory_test.child_files[child_file_name]
 
-    result = subprocess.run(["pdm", "run", "lint"], cwd=copy_directory)
+    for child_directory_name in [".git", ".venv"]:
+        del directory_test.child_directories[child_directory_name]
 
-    assert result.returncode == 0
+    return directory_test
 
-    result = subprocess.run(
-        ["pdm", "run", "format:black", "--diff"], cwd=copy_directory
-    )
 
-    assert result.returncode == 0
+def _run_render_test(
+    output_directory: str, data: Dict[str, str], directory_test: DirectoryTest
+) -> None:
+    # Copier runs tasks with plumbum's copy of the environment, which is taken when
+    # plumbum is imported, so the variable has to be set there.
+    with plumbum.local.env(COPIER_ML_SKIP_POST_COPY="1"):
+        copier.run_copy(
+            ".",
+            output_directory,
+            data=data,
+            unsafe=True,
+            quiet=True,
+        )
 
-    result = subprocess.run(["pdm", "run", "format:isort", "-c"], cwd=copy_directory)
+    directory_test.run(output_directory)
 
-    assert result.returncode == 0
 
-    result = subprocess.run(["pdm", "run", "format"], cwd=copy_directory)
+LICENSES = ["mit", "lgpl30", "none"]
+PYTHON_VERSIONS = ["3-8", "3-9", "3-10", "3-11"]
 
-    assert result.returncode == 0
-
-    result = subprocess.run(["pdm", "run", "test"], cwd=copy_directory)
-
-    assert result.returncode == 0
+if sys.platform == "darwin":
+    CUDA_VERSIONS = ["default"]
+else:
+    CUDA_VERSIONS = ["default", "cuda-11-7", "cuda-11-8"]
 
+# Set this environment variable to run every combination in the install tier rather
+# than a smoke subset
+FULL_MATRIX = os.environ.get("COPIER_ML_FULL_MATRIX") is not None
 
 minimal_parameters = []
 maximal_parameters = []
 
-for license in ["mit", "lgpl30"]:
-    minimal_parameters.append((license, "3-11"))
+if FULL_MATRIX:
+    for license in ["mit", "lgpl30"]:
+        minimal_parameters.append((license, "3-11"))
 
-for python_version in ["3-8", "3-9", "3-10", "3-11"]:
-    minimal_parameters.append(("none", python_version))
+    for python_version in PYTHON_VERSIONS:
+        minimal_parameters.append(("none", python_version))
 
-
-for python_version in ["3-8", "3-9", "3-10", "3-11"]:
-    if sys.platform == "darwin":
-        maximal_parameters.append((python_version, "default"))
-    else:
-        for cuda_version in ["default", "cuda-11-7", "cuda-11-8"]:
+    for python_version in PYTHON_VERSIONS:
+        for cuda_version in CUDA_VERSIONS:
             maximal_parameters.append((python_version, cuda_version))
+else:
+    minimal_parameters.append(("mit", "3-11"))
+    minimal_parameters.append(("none", "3-8"))
+    maximal_parameters.append(("3-11", "default"))
 
 
+@pytest.mark.install
+@pytest.mark.cost(1)
 @pytest.mark.parametrize("license,python_version", minimal_parameters)
 def test_minimal(license: str, python_version: str) -> None:
     """Test minimal Copier usage."""
@@ -530,13 +665,55 @@ def test_minimal(license: str, python_version: str) -> None:
     )
 
 
+@pytest.mark.install
+@pytest.mark.cost(4)
 @pytest.mark.parametrize("python_version,cuda_version", maximal_parameters)
 def test_maximal(python_version: str, cuda_version: str) -> None:
     """Test maximal Copier usage."""
     _run_copy_test(
         copy_name=f"maximal-{python_version}-{cuda_version}",
+        data=_create_data_maximal(
+            license="lgpl30", python_version=python_version, cuda_version=cuda_version
+        ),
+        directory_test=_create_directory_test_maximal("lgpl30", cuda_version),
+    )
+
+
+@pytest.mark.render
+@pytest.mark.parametrize("license", LICENSES)
+@pytest.mark.parametrize("python_version", PYTHON_VERSIONS)
+def test_render_minimal(
+    license: str,
+    python_version: str,
+    tmp_path: str,
+) -> None:
+    """Test rendering minimal Copier usage without the post-copy script."""
+    _run_render_test(
+        output_directory=os.path.join(tmp_path, "language-model"),
+        data=_create_data_minimal(license=license, python_version=python_version),
+        directory_test=_remove_post_copy_outputs(
+            _create_directory_test_minimal(license, "default"), "default"
+        ),
+    )
+
+
+@pytest.mark.render
+@pytest.mark.parametrize("license", LICENSES)
+@pytest.mark.parametrize("python_version", PYTHON_VERSIONS)
+@pytest.mark.parametrize("cuda_version", CUDA_VERSIONS)
+def test_render_maximal(
+    license: str,
+    python_version: str,
+    cuda_version: str,
+    tmp_path: str,
+) -> None:
+    """Test rendering maximal Copier usage without the post-copy script."""
+    _run_render_test(
+        output_directory=os.path.join(tmp_path, "language-model"),
         data=_create_data_maximal(
             license=license, python_version=python_version, cuda_version=cuda_version
         ),
-        directory_test=_create_directory_test_maximal(license, cuda_version),
+        directory_test=_remove_post_copy_outputs(
+            _create_directory_test_maximal(license, cuda_version), cuda_version
+        ),
     )
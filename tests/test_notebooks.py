@@ -0,0 +1,118 @@
+# Copyright 2023 Sophie Katz
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the “Software”), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Tests for the notebook runner script of the template."""
+
+
+import os
+
+import nbformat
+import pytest
+
+from tests.testing_utils import load_template_script
+
+notebooks = load_template_script("notebooks")
+
+
+def _create_notebook() -> nbformat.NotebookNode:
+    notebook = nbformat.v4.new_notebook()
+    notebook.metadata["kernelspec"] = {"name": "python3"}
+    notebook.cells = [
+        nbformat.v4.new_markdown_cell("# Title"),
+        nbformat.v4.new_code_cell("learning_rate = 0.1"),
+        nbformat.v4.new_code_cell("print(learning_rate)"),
+    ]
+    notebook.cells[1].metadata["tags"] = [notebooks.PARAMETERS_TAG]
+
+    return notebook
+
+
+@pytest.mark.scripts
+def test_parse_parameters() -> None:
+    """Test that parameter values are parsed as JSON where possible."""
+    assert notebooks.parse_parameters(
+        [["learning_rate", "0.01"], ["name", "baseline"], ["layers", "[1, 2]"]]
+    ) == {"learning_rate": 0.01, "name": "baseline", "layers": [1, 2]}
+
+
+@pytest.mark.scripts
+def test_inject_parameters() -> None:
+    """Test that parameters are injected after the cell tagged parameters."""
+    notebook = _create_notebook()
+    notebooks.inject_parameters(notebook, {"learning_rate": 0.01, "name": "baseline"})
+
+    assert len(notebook.cells) == 4
+    assert notebook.cells[2].source == "learning_rate = 0.01\nname = 'baseline'"
+    assert notebook.cells[2].metadata["tags"] == [notebooks.INJECTED_PARAMETERS_TAG]
+
+    notebook = _create_notebook()
+    notebooks.inject_parameters(notebook, {})
+
+    assert len(notebook.cells) == 3
+
+    notebook = _create_notebook()
+    notebook.cells[1].metadata["tags"] = []
+    notebooks.inject_parameters(notebook, {"learning_rate": 0.01})
+
+    assert notebook.cells[0].source == "learning_rate = 0.01"
+
+
+@pytest.mark.scripts
+def test_get_cell_keys() -> None:
+    """Test that editing a cell changes its key and the keys below it."""
+    notebook = _create_notebook()
+    keys = notebooks.get_cell_keys(notebook)
+
+    assert keys[0] is None
+    assert keys[1] is not None and keys[2] is not None
+
+    notebook.cells[0].source = "# Another title"
+
+    assert notebooks.get_cell_keys(notebook) == keys
+
+    notebook.cells[2].source = "print(learning_rate * 2)"
+    edited_keys = notebooks.get_cell_keys(notebook)
+
+    assert edited_keys[1] == keys[1]
+    assert edited_keys[2] != keys[2]
+
+    notebook.cells[1].source = "learning_rate = 0.2"
+
+    assert notebooks.get_cell_keys(notebook)[2] != edited_keys[2]
+
+    notebook.metadata["kernelspec"] = {"name": "other"}
+
+    assert notebooks.get_cell_keys(notebook)[1] != keys[1]
+
+
+@pytest.mark.scripts
+def test_execute_notebook_missing_kernel(
+    tmp_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a notebook whose kernel is missing is recorded as failed."""
+    monkeypatch.chdir(tmp_path)
+    nbformat.write(_create_notebook(), "notebook.ipynb")
+
+    summary = notebooks.execute_notebook(
+        "notebook.ipynb", "run", {}, "no-such-kernel", 10, use_cache=False
+    )
+
+    assert summary["status"] == "failed"
+    assert summary["error"].startswith("NoSuchKernel")
+    assert os.path.exists(os.path.join("run", "notebook.ipynb"))
@@ -0,0 +1,334 @@
+# Copyright 2023 Sophie Katz
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the “Software”), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Tests for the lockfile management script of the template.
+
+PDM runs ``scripts/pdm_lockfile.py check`` before every lock, so its startup time is
+measured here.
+"""
+
+
+import base64
+import hashlib
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+from typing import Callable, Dict, List, Tuple
+
+import pytest
+import termcolor
+
+from tests.testing_utils import TEMPLATE_SCRIPTS_DIRECTORY, load_template_script
+
+SCRIPT_PATH = os.path.join(TEMPLATE_SCRIPTS_DIRECTORY, "pdm_lockfile.py")
+
+# Modules that the check command must not import
+CHECK_DEFERRED_MODULES = [
+    "argparse",
+    "concurrent.futures",
+    "csv",
+    "hashlib",
+    "json",
+    "subprocess",
+    "sysconfig",
+    "termcolor",
+    "tomllib",
+    "tomli",
+]
+
+# The most CPU time that the check command may take, as a multiple of the CPU time
+# Python takes to start. Importing what the check command defers takes about 1.6
+# times as long as starting Python.
+CHECK_MAX_STARTUP_RATIO = 1.4
+
+# The number of times each command is run, of which the median time is used
+TIMING_REPEATS = 11
+
+
+def _create_lockfiles(directory: str, filenames: List[str], current: str) -> None:
+    for filename in filenames:
+        with open(os.path.join(directory, filename), "w") as file:
+            file.write("")
+
+    os.symlink(current, os.path.join(directory, "pdm.lock"))
+
+
+def _get_cpu_seconds(args: List[str], cwd: str) -> float:
+    # CPU time is measured rather than wall time, which depends on the load on the
+    # machine, for example from other pytest-xdist workers
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    subprocess.run(args, cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return after.ru_utime - before.ru_utime + after.ru_stime - before.ru_stime
+
+
+def _get_median_cpu_seconds(
+    first_args: List[str], second_args: List[str], cwd: str
+) -> Tuple[float, float]:
+    # The commands take turns, so both are measured under the same load
+    first_durations = []
+    second_durations = []
+
+    for _ in range(TIMING_REPEATS):
+        first_durations.append(_get_cpu_seconds(first_args, cwd))
+        second_durations.append(_get_cpu_seconds(second_args, cwd))
+
+    return statistics.median(first_durations), statistics.median(second_durations)
+
+
+@pytest.mark.scripts
+def test_lockfile_summary(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test listing lockfiles and the group they are set to."""
+    _create_lockfiles(
+        str(tmp_path),
+        [
+            "pdm.linux.default.lock",
+            "pdm.linux.cuda-11-8.lock",
+            "pdm.darwin.default.lock",
+            "pdm.linux.default.lock.bak",
+        ],
+        "pdm.linux.cuda-11-8.lock",
+    )
+    monkeypatch.chdir(tmp_path)
+
+    pdm_lockfile = load_template_script("pdm_lockfile")
+    summary = pdm_lockfile.get_pdm_lockfile_summary()
+
+    assert summary.current_filename == "pdm.linux.cuda-11-8.lock"
+    assert summary.lockfiles == [
+        (False, "darwin", "default"),
+        (True, "linux", "cuda-11-8"),
+        (False, "linux", "default"),
+    ]
+    assert pdm_lockfile.list_pdm_lockfiles() == summary.lockfiles
+    assert pdm_lockfile.get_current_pdm_group() == "cuda-11-8"
+
+
+@pytest.mark.scripts
+def test_lockfile_summary_after_use(
+    tmp_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the cached lockfile summary follows the lockfile in use."""
+    _create_lockfiles(
+        str(tmp_path),
+        [f"pdm.{sys.platform}.default.lock", f"pdm.{sys.platform}.cuda-11-8.lock"],
+        f"pdm.{sys.platform}.default.lock",
+    )
+    monkeypatch.chdir(tmp_path)
+
+    pdm_lockfile = load_template_script("pdm_lockfile")
+
+    assert pdm_lockfile.get_current_pdm_group() == "default"
+
+    pdm_lockfile.use_pdm_lockfile("cuda-11-8")
+
+    assert pdm_lockfile.get_current_pdm_group() == "cuda-11-8"
+    assert pdm_lockfile.list_pdm_lockfiles() == [
+        (True, sys.platform, "cuda-11-8"),
+        (False, sys.platform, "default"),
+    ]
+
+
+@pytest.mark.scripts
+def test_check_imports(tmp_path: str) -> None:
+    """Test that the check command does not import what only other commands need."""
+    _create_lockfiles(
+        str(tmp_path), ["pdm.linux.default.lock"], "pdm.linux.default.lock"
+    )
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", SCRIPT_PATH, "check"],
+        cwd=tmp_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    imported_modules = {
+        line.rpartition("|")[2].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+    for module_name in CHECK_DEFERRED_MODULES:
+        assert module_name not in imported_modules
+
+
+@pytest.mark.scripts
+def test_check_startup_time(
+    tmp_path: str, record_property: Callable[[str, object], None]
+) -> None:
+    """Test that the check command takes little longer than Python takes to start."""
+    _create_lockfiles(
+        str(tmp_path), ["pdm.linux.default.lock"], "pdm.linux.default.lock"
+    )
+
+    python_seconds, check_seconds = _get_median_cpu_seconds(
+        [sys.executable, "-c", "pass"], [sys.executable, SCRIPT_PATH, "check"], tmp_path
+    )
+
+    record_property("python_startup_seconds", python_seconds)
+    record_property("check_seconds", check_seconds)
+
+    assert check_seconds < python_seconds * CHECK_MAX_STARTUP_RATIO
+
+
+@pytest.mark.scripts
+def test_stamped_lockfile_up_to_date(tmp_path: str) -> None:
+    """Test that a lockfile locked at copy time is up to date once stamped."""
+    with open(os.path.join(tmp_path, "pyproject.toml"), "w") as file:
+        file.write('[project]\ndependencies = ["numpy"]\n')
+
+    _create_lockfiles(
+        str(tmp_path),
+        [f"pdm.{sys.platform}.default.lock"],
+        f"pdm.{sys.platform}.default.lock",
+    )
+
+    def run(*args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, SCRIPT_PATH, *args],
+            cwd=tmp_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+
+    assert run("status").returncode == 1
+
+    result = run("stamp", "default")
+
+    assert result.returncode == 0, result.stdout
+
+    result = run("status")
+
+    assert result.returncode == 0, result.stdout
+    assert "up to date" in result.stdout
+
+
+def _create_site_packages(
+    directory: str, files: Dict[str, bytes], records: Dict[str, bytes]
+) -> None:
+    # Writes installed files and a RECORD that lists the hashes of the given contents
+    os.makedirs(os.path.join(directory, "package"))
+    os.makedirs(os.path.join(directory, "package-1.0.dist-info"))
+
+    for name, content in files.items():
+        with open(os.path.join(directory, "package", name), "wb") as file:
+            file.write(content)
+
+    with open(os.path.join(directory, "package-1.0.dist-info", "RECORD"), "w") as file:
+        for name, content in records.items():
+            digest = base64.urlsafe_b64encode(hashlib.sha256(content).digest())
+            file.write(
+                f"package/{name},sha256={digest.rstrip(b'=').decode()},{len(content)}\n"
+            )
+
+
+@pytest.mark.scripts
+def test_deduplicate_site_packages(
+    tmp_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that only files that match their RECORD are shared between projects."""
+    monkeypatch.setenv("PDM_LOCKFILE_WHEELHOUSE", os.path.join(tmp_path, "wheelhouse"))
+
+    pdm_lockfile = load_template_script("pdm_lockfile")
+    shared = b"shared" * 10000
+    original = b"original" * 10000
+    edited = b"edited" * 10000
+
+    first = os.path.join(tmp_path, "first")
+    _create_site_packages(
+        first,
+        {"shared.bin": shared, "edited.bin": edited},
+        {"shared.bin": shared, "edited.bin": original},
+    )
+
+    assert pdm_lockfile.deduplicate_site_packages(first) == (1, len(shared))
+
+    second = os.path.join(tmp_path, "second")
+    _create_site_packages(
+        second,
+        {"shared.bin": shared, "edited.bin": original},
+        {"shared.bin": shared, "edited.bin": original},
+    )
+
+    assert pdm_lockfile.deduplicate_site_packages(second) == (
+        2,
+        len(shared) + len(original),
+    )
+    assert os.path.samefile(
+        os.path.join(first, "package", "shared.bin"),
+        os.path.join(second, "package", "shared.bin"),
+    )
+    assert not os.path.samefile(
+        os.path.join(first, "package", "edited.bin"),
+        os.path.join(second, "package", "edited.bin"),
+    )
+
+    with open(os.path.join(first, "package", "edited.bin"), "rb") as file:
+        assert file.read() == edited
+
+
+@pytest.mark.scripts
+def test_ensure_pip(tmp_path: str) -> None:
+    """Test that pip is installed into a venv that was created without it."""
+    venv_directory = os.path.join(tmp_path, "venv")
+    subprocess.run(
+        [sys.executable, "-m", "venv", "--without-pip", venv_directory], check=True
+    )
+    python_path = os.path.join(
+        venv_directory, "Scripts" if sys.platform == "win32" else "bin", "python"
+    )
+
+    assert (
+        subprocess.run(
+            [python_path, "-m", "pip", "--version"], stderr=subprocess.DEVNULL
+        ).returncode
+        != 0
+    )
+
+    # The script prints with termcolor, which is copied on its own so that the pip
+    # next to it stays hidden
+    library_directory = os.path.join(tmp_path, "library")
+    shutil.copytree(
+        os.path.dirname(termcolor.__file__),
+        os.path.join(library_directory, "termcolor"),
+    )
+
+    subprocess.run(
+        [
+            python_path,
+            "-c",
+            "import sys; sys.path[:0] = sys.argv[1:]; import pdm_lockfile; "
+            "sys.exit(0 if pdm_lockfile.ensure_pip() else 1)",
+            os.path.dirname(SCRIPT_PATH),
+            library_directory,
+        ],
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+
+    assert subprocess.run([python_path, "-m", "pip", "--version"]).returncode == 0
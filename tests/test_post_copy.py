@@ -0,0 +1,116 @@
+# Copyright 2023 Sophie Katz
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the “Software”), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies
+# or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Tests for the venv cache of the post-copy script."""
+
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.testing_utils import SCRIPTS_DIRECTORY, load_script
+
+post_copy = load_script(SCRIPTS_DIRECTORY, "post_copy")
+
+PYPROJECT = """[project]
+name = "{name}"
+dependencies = ["{dependency}"]
+requires-python = ">=3.8"
+"""
+
+
+def _write_pyproject(directory: str, name: str, dependency: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "pyproject.toml"), "w") as file:
+        file.write(PYPROJECT.format(name=name, dependency=dependency))
+
+
+def _create_snapshot(cache_directory: str, name: str, size: int) -> None:
+    os.makedirs(os.path.join(cache_directory, name, "venv"))
+
+    with open(
+        os.path.join(cache_directory, name, post_copy.VENV_SNAPSHOT_METADATA_FILENAME),
+        "w",
+    ) as file:
+        json.dump({"project": "/project", "size": size}, file)
+
+
+@pytest.mark.scripts
+def test_venv_snapshot_key(tmp_path: str) -> None:
+    """Test that venv snapshots are keyed by the versions and the dependencies."""
+    first = os.path.join(tmp_path, "first")
+    second = os.path.join(tmp_path, "second")
+    third = os.path.join(tmp_path, "third")
+
+    _write_pyproject(first, "first", "numpy>=1.24.0")
+    _write_pyproject(second, "second", "numpy>=1.24.0")
+    _write_pyproject(third, "third", "numpy>=1.25.0")
+
+    key = post_copy.get_venv_snapshot_key("3.11", "none", first)
+
+    # The key does not need a lock file and ignores the project name.
+    assert post_copy.get_venv_snapshot_key("3.11", "none", second) == key
+    assert post_copy.get_venv_snapshot_key("3.11", "none", third) != key
+    assert post_copy.get_venv_snapshot_key("3.10", "none", first) != key
+    assert post_copy.get_venv_snapshot_key("3.11", "12.1", first) != key
+
+
+@pytest.mark.scripts
+def test_venv_snapshot_key_without_tomli(
+    tmp_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that there is no key if pyproject.toml cannot be parsed."""
+    _write_pyproject(str(tmp_path), "project", "numpy>=1.24.0")
+
+    # Copier's interpreter has no TOML parser before Python 3.11
+    monkeypatch.setattr(sys, "version_info", (3, 10, 0))
+    monkeypatch.setitem(sys.modules, "tomli", None)
+
+    assert post_copy.get_venv_snapshot_key("3.10", "none", str(tmp_path)) is None
+
+
+@pytest.mark.scripts
+def test_evict_venv_snapshots(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that old snapshots and interrupted saves are removed from the cache."""
+    cache_directory = str(tmp_path)
+    monkeypatch.setenv(post_copy.VENV_CACHE_DIR_ENVIRONMENT_VARIABLE, cache_directory)
+
+    # A process that has exited, so its temporary snapshot is stale
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+
+    os.makedirs(os.path.join(cache_directory, f"stale.{process.pid}.tmp"))
+    os.makedirs(os.path.join(cache_directory, f"saving.{os.getpid()}.tmp"))
+
+    _create_snapshot(cache_directory, "old", 10)
+    _create_snapshot(cache_directory, "new", 10)
+    os.utime(
+        os.path.join(cache_directory, "old", post_copy.VENV_SNAPSHOT_METADATA_FILENAME),
+        (0, 0),
+    )
+
+    post_copy.evict_venv_snapshots(15)
+
+    assert sorted(
+        name for name in os.listdir(cache_directory) if not name.startswith(".")
+    ) == ["new", f"saving.{os.getpid()}.tmp"]
@@ -18,22 +18,97 @@
 # OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import dataclasses
+import importlib.util
 import os
 import shutil
-from typing import Callable, Dict, List
+import sys
+from types import ModuleType
+from typing import Callable, Dict, List, Optional
 
 COPIES_DIRECTORY = os.path.join(os.getcwd(), "copies")
 
+# Caches shared by every test case and every pytest-xdist worker
+CACHE_DIRECTORY = os.path.join(COPIES_DIRECTORY, ".cache")
 
-def before_integration_test(copy_name: str) -> None:
-    """Code to be run before all integration tests."""
+# The root of this repository
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The scripts of this repository, such as the post-copy script
+SCRIPTS_DIRECTORY = os.path.join(REPOSITORY_DIRECTORY, "scripts")
+
+# The scripts that the template copies into every project
+TEMPLATE_SCRIPTS_DIRECTORY = os.path.join(REPOSITORY_DIRECTORY, "template", "scripts")
+
+
+def get_copies_directory() -> str:
+    """Gets the directory that this test process renders copies into.
+
+    Each pytest-xdist worker gets its own subdirectory, so workers never delete each
+    other's copies.
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+
+    if worker is None:
+        return COPIES_DIRECTORY
+
+    return os.path.join(COPIES_DIRECTORY, worker)
+
+
+def load_script(directory: str, name: str) -> ModuleType:
+    """Imports a script by its name from the given directory.
+
+    The directory is on the import path while the script is imported, as it is when
+    the script is run, so the script can import modules next to it.
+    """
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(directory, f"{name}.py")
+    )
+    assert spec is not None and spec.loader is not None
+
+    module = importlib.util.module_from_spec(spec)
+    sys.path.insert(0, directory)
+
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(directory)
+
+    return module
+
+
+def load_template_script(name: str) -> ModuleType:
+    """Imports one of the template's scripts, such as ``pdm_lockfile``, by its name."""
+    return load_script(TEMPLATE_SCRIPTS_DIRECTORY, name)
+
+
+# A check that runs on many files at once, such as a formatter in check mode. It is
+# given every path that was collected for it.
+BatchCheck = Callable[[List[str]], None]
+
+
+def run_batch_checks(batches: Dict[BatchCheck, List[str]]) -> None:
+    """Runs each batch check once on every path collected for it."""
+    for check, paths in batches.items():
+        if len(paths) > 0:
+            check(paths)
+
+
+def before_integration_test(copy_name: str) -> str:
+    """Code to be run before all integration tests.
+
+    Returns the directory to render the copy into.
+    """
     if not os.path.exists(".git") or not os.path.exists("copier.yml"):
         raise Exception(
             "this script must be run from the root directory of the copier-ml repository"
         )
 
-    os.makedirs(COPIES_DIRECTORY, exist_ok=True)
-    shutil.rmtree(os.path.join(COPIES_DIRECTORY, copy_name), ignore_errors=True)
+    copy_directory = os.path.join(get_copies_directory(), copy_name)
+
+    os.makedirs(get_copies_directory(), exist_ok=True)
+    shutil.rmtree(copy_directory, ignore_errors=True)
+
+    return copy_directory
 
 
 @dataclasses.dataclass
@@ -41,8 +116,16 @@ class FileTest:
     optional: bool = False
     on_text: List[Callable[[str], None]] = dataclasses.field(default_factory=list)
     on_path: List[Callable[[str], None]] = dataclasses.field(default_factory=list)
+    on_batch: List[BatchCheck] = dataclasses.field(default_factory=list)
+
+    def run(
+        self, path: str, batches: Optional[Dict[BatchCheck, List[str]]] = None
+    ) -> None:
+        """Runs the checks on a file.
 
-    def run(self, path: str) -> None:
+        Batch checks are only collected into ``batches`` if it is given, so that the
+        caller can run them on many files at once. Otherwise they are run right away.
+        """
         if not self.optional:
             assert os.path.isfile(
                 path
@@ -60,6 +143,12 @@ class FileTest:
             for f in self.on_path:
                 f(path)
 
+            if batches is None:
+                run_batch_checks({check: [path] for check in self.on_batch})
+            else:
+                for check in self.on_batch:
+                    batches.setdefault(check, []).append(path)
+
 
 @dataclasses.dataclass
 class DirectoryTest:
@@ -70,7 +159,20 @@ class DirectoryTest:
     )
     ignore_children: bool = False
 
-    def run(self, path: str) -> None:
+    def run(
+        self, path: str, batches: Optional[Dict[BatchCheck, List[str]]] = None
+    ) -> None:
+        """Runs the checks on a directory and everything in it.
+
+        Batch checks of every file in the tree are collected and run once per check
+        at the end, unless ``batches`` is given by a parent directory.
+        """
+        if batches is None:
+            batches = {}
+            self.run(path, batches)
+            run_batch_checks(batches)
+            return
+
         if not self.optional:
             assert os.path.isdir(
                 path
@@ -88,10 +190,10 @@ class DirectoryTest:
                 )
         elif os.path.isdir(path):
             for child_directory_name, child_directory in self.child_directories.items():
-                child_directory.run(os.path.join(path, child_directory_name))
+                child_directory.run(os.path.join(path, child_directory_name), batches)
 
             for child_file_name, child_file in self.child_files.items():
-                child_file.run(os.path.join(path, child_file_name))
+                child_file.run(os.path.join(path, child_file_name), batches)
 
             for child_name in os.listdir(path):
                 assert (